@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import os.path as osp
+import tempfile
+import time
+
+import numpy as np
+import osam
+from loguru import logger
+
+
+def get_default_cache_dir() -> str:
+    cache_home: str = os.environ.get("XDG_CACHE_HOME") or osp.join(
+        osp.expanduser("~"), ".cache"
+    )
+    return osp.join(cache_home, "labelme", "image_embeddings")
+
+
+# temporary files older than this are left over by failed or killed writers
+_STALE_TMP_FILE_SECONDS = 3600
+
+
+class EmbeddingCache:
+    """
+    Image embeddings stored as compressed `.npz` files on disk.
+
+    Files are named by a hash of the model name and the image key. When the
+    total size exceeds max_size_bytes, the least recently used files are
+    removed, using the file modification time, which is refreshed on reads.
+
+    Args:
+        cache_dir: Directory of the cache files
+        max_size_bytes: Maximum total size of the cache files
+    """
+
+    def __init__(self, cache_dir: str, max_size_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+
+    def _get_cache_file(self, model_name: str, image_key: str) -> str:
+        digest = hashlib.blake2b(
+            f"{model_name}\0{image_key}".encode(), digest_size=16
+        ).hexdigest()
+        return osp.join(self.cache_dir, f"{digest}.npz")
+
+    def get(self, model_name: str, image_key: str) -> osam.types.ImageEmbedding | None:
+        cache_file = self._get_cache_file(model_name=model_name, image_key=image_key)
+        if not osp.exists(cache_file):
+            return None
+        try:
+            with np.load(cache_file) as data:
+                image_embedding = osam.types.ImageEmbedding(
+                    original_height=int(data["original_height"]),
+                    original_width=int(data["original_width"]),
+                    embedding=data["embedding"],
+                    extra_features=[
+                        data[f"extra_features_{i}"]
+                        for i in range(int(data["num_extra_features"]))
+                    ],
+                )
+            os.utime(cache_file)  # mark as recently used
+        except Exception as e:
+            logger.warning("Failed to load image embedding {!r}: {}", cache_file, e)
+            return None
+        logger.debug("Loaded image embedding from {!r}", cache_file)
+        return image_embedding
+
+    def put(
+        self,
+        model_name: str,
+        image_key: str,
+        image_embedding: osam.types.ImageEmbedding,
+    ) -> None:
+        cache_file = self._get_cache_file(model_name=model_name, image_key=image_key)
+        tmp_file: str | None = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file first, so readers never see partial files
+            fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix=".npz.tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    original_height=image_embedding.original_height,
+                    original_width=image_embedding.original_width,
+                    embedding=image_embedding.embedding,
+                    num_extra_features=len(image_embedding.extra_features),
+                    **{
+                        f"extra_features_{i}": extra_feature
+                        for i, extra_feature in enumerate(
+                            image_embedding.extra_features
+                        )
+                    },
+                )
+            os.replace(tmp_file, cache_file)
+            tmp_file = None
+        except OSError as e:
+            logger.warning("Failed to save image embedding {!r}: {}", cache_file, e)
+            return
+        finally:
+            if tmp_file is not None:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+        self._evict()
+
+    def _evict(self) -> None:
+        entries: list[tuple[float, int, str]] = []
+        stale_tmp_files: list[str] = []
+        t_stale = time.time() - _STALE_TMP_FILE_SECONDS
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith(".npz"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    elif (
+                        entry.name.endswith(".npz.tmp")
+                        and entry.stat().st_mtime < t_stale
+                    ):
+                        stale_tmp_files.append(entry.path)
+        except OSError as e:
+            logger.warning("Failed to list image embeddings: {}", e)
+            return
+
+        for path in stale_tmp_files:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            logger.debug("Removed stale temporary file {!r}", path)
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            logger.debug("Evicted image embedding {!r}", path)
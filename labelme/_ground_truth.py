@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import collections
+import copy
+import os
+import os.path as osp
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from labelme import utils
+from labelme._label_file import LabelFile
+from labelme._label_file import ShapeDict
+
+
+def shapes_to_combined_mask(
+    img_shape: tuple[int, int], shapes: list[ShapeDict]
+) -> NDArray[np.bool_]:
+    """Rasterize the union of ground truth shapes into one binary mask."""
+    combined_mask = np.zeros(img_shape, dtype=bool)
+
+    for shape_dict in shapes:
+        points = shape_dict["points"]
+        shape_type = shape_dict.get("shape_type", "polygon")
+
+        if shape_type == "mask" and shape_dict.get("mask") is not None:
+            mask = shape_dict["mask"]
+            (x1, y1), (x2, y2) = np.asarray(points).astype(int)
+
+            # Ensure coordinates are within bounds
+            x1 = max(0, min(x1, img_shape[1] - 1))
+            y1 = max(0, min(y1, img_shape[0] - 1))
+            x2 = max(0, min(x2, img_shape[1]))
+            y2 = max(0, min(y2, img_shape[0]))
+
+            if x2 > x1 and y2 > y1:
+                mask_h, mask_w = mask.shape
+                h, w = min(y2 - y1, mask_h), min(x2 - x1, mask_w)
+                combined_mask[y1 : y1 + h, x1 : x1 + w] |= mask[:h, :w]
+        else:
+            combined_mask |= utils.shape_to_mask(img_shape, points, shape_type)
+
+    return combined_mask
+
+
+def _get_mask_cache_file(filename: str, img_shape: tuple[int, int]) -> str:
+    height, width = img_shape
+    return f"{osp.splitext(filename)[0]}.{height}x{width}.npy"
+
+
+def _read_mask_cache_file(
+    cache_file: str, img_shape: tuple[int, int], mtime_ns: int
+) -> NDArray[np.bool_] | None:
+    try:
+        if os.stat(cache_file).st_mtime_ns < mtime_ns:
+            return None
+        packed = np.load(cache_file)
+        mask = np.unpackbits(packed, axis=-1, count=img_shape[1]).astype(bool)
+    except (OSError, ValueError) as e:
+        logger.debug("Failed to read ground truth mask cache {!r}: {}", cache_file, e)
+        return None
+    if mask.shape != img_shape:
+        return None
+    return mask
+
+
+def _write_mask_cache_file(cache_file: str, mask: NDArray[np.bool_]) -> None:
+    try:
+        np.save(cache_file, np.packbits(mask, axis=-1))
+    except OSError as e:
+        logger.warning(
+            "Failed to write ground truth mask cache {!r}: {}", cache_file, e
+        )
+
+
+# Parsed shapes and masks of recently loaded files, least recently used first
+# out. A 6000x4000 mask takes 24MB, so the cache is bounded by size.
+_CACHE_MAX_SIZE_BYTES = 128 * 1024**2
+
+_CacheKey = tuple[str, int, tuple[int, int], bool]
+
+_cache: collections.OrderedDict[
+    _CacheKey, tuple[list[ShapeDict], NDArray[np.bool_]]
+] = collections.OrderedDict()
+_cache_size_bytes = 0
+
+
+def _clear_cache() -> None:
+    global _cache_size_bytes
+    _cache.clear()
+    _cache_size_bytes = 0
+
+
+def _load_ground_truth(
+    filename: str,
+    mtime_ns: int,
+    img_shape: tuple[int, int],
+    use_cache_file: bool,
+) -> tuple[list[ShapeDict], NDArray[np.bool_]]:
+    global _cache_size_bytes
+
+    key: _CacheKey = (filename, mtime_ns, img_shape, use_cache_file)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    shapes: list[ShapeDict] = LabelFile.load_shapes_only(filename).shapes
+
+    mask: NDArray[np.bool_] | None = None
+    cache_file = _get_mask_cache_file(filename=filename, img_shape=img_shape)
+    if use_cache_file:
+        mask = _read_mask_cache_file(
+            cache_file=cache_file, img_shape=img_shape, mtime_ns=mtime_ns
+        )
+    if mask is None:
+        mask = shapes_to_combined_mask(img_shape=img_shape, shapes=shapes)
+        if use_cache_file:
+            _write_mask_cache_file(cache_file=cache_file, mask=mask)
+
+    # shared between cache hits
+    mask.flags.writeable = False
+    if mask.nbytes <= _CACHE_MAX_SIZE_BYTES:
+        _cache[key] = (shapes, mask)
+        _cache_size_bytes += mask.nbytes
+        while _cache_size_bytes > _CACHE_MAX_SIZE_BYTES:
+            _, (_, evicted_mask) = _cache.popitem(last=False)
+            _cache_size_bytes -= evicted_mask.nbytes
+    return shapes, mask
+
+
+def load_ground_truth(
+    filename: str, img_shape: tuple[int, int], use_cache_file: bool = False
+) -> tuple[list[ShapeDict], NDArray[np.bool_]]:
+    """
+    Load ground truth shapes and their combined mask.
+
+    Results are cached by file path, modification time and image shape, so
+    revisiting an image skips parsing and rasterization. With
+    `use_cache_file`, the mask is also stored as a packed-bit `.npy` file
+    next to the ground truth file and reused across sessions.
+
+    The returned mask is read-only and shared between calls, while the shapes
+    are a copy that the caller may modify.
+    """
+    shapes, mask = _load_ground_truth(
+        filename=osp.abspath(filename),
+        mtime_ns=os.stat(filename).st_mtime_ns,
+        img_shape=(int(img_shape[0]), int(img_shape[1])),
+        use_cache_file=use_cache_file,
+    )
+    return copy.deepcopy(shapes), mask
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import collections
+import hashlib
+import os
+import os.path as osp
+
+import numpy as np
+import PIL.Image
+from loguru import logger
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+
+from labelme._label_file import LabelFile
+
+
+def get_label_file(filename: str, output_dir: str | None) -> str:
+    """Return the label file path for an image, assuming the same name."""
+    label_file = f"{osp.splitext(filename)[0]}.json"
+    if output_dir:
+        label_file = osp.join(output_dir, osp.basename(label_file))
+    return label_file
+
+
+def _get_mtime_ns(filename: str) -> int | None:
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
+
+
+# formats of QImage.fromData for PNG data of these modes
+_QIMAGE_FORMATS = {
+    "RGB": QtGui.QImage.Format_RGB32,
+    "RGBA": QtGui.QImage.Format_ARGB32,
+    "L": QtGui.QImage.Format_Grayscale8,
+}
+
+
+def _pil_to_qimage(image_pil: PIL.Image.Image) -> QtGui.QImage:
+    """
+    Convert to a QImage as decoded by QImage.fromData from its PNG data.
+
+    A null image is returned for unsupported modes.
+    """
+    if image_pil.mode not in _QIMAGE_FORMATS:
+        return QtGui.QImage()
+    if image_pil.mode == "L":
+        arr = np.ascontiguousarray(image_pil)
+        image = QtGui.QImage(
+            arr.data, arr.shape[1], arr.shape[0], arr.strides[0], _QIMAGE_FORMATS["L"]
+        )
+        return image.copy()  # detached from arr
+    arr = np.ascontiguousarray(image_pil.convert("RGBA"))
+    image = QtGui.QImage(
+        arr.data,
+        arr.shape[1],
+        arr.shape[0],
+        arr.strides[0],
+        QtGui.QImage.Format_RGBA8888,
+    )
+    return image.convertToFormat(_QIMAGE_FORMATS[image_pil.mode])
+
+
+class LoadedImage:
+    """
+    An image file, or a label file and its image, read and decoded.
+
+    `image` is null if the image data could not be decoded.
+    """
+
+    def __init__(self, filename: str, label_file: str):
+        self.filename = filename
+        self.label_file = label_file
+        # recorded before reading, so that a concurrent write makes it stale
+        self._mtimes = self._get_mtimes()
+
+        self.label_file_obj: LabelFile | None = None
+        self.image_path: str | None = None
+        self.image_data: bytes | None = None
+        # the pixels of image_data, if re-encoded from the image file
+        image_pil: PIL.Image.Image | None = None
+        if osp.exists(label_file) and LabelFile.is_label_file(label_file):
+            # raises LabelFileError
+            self.label_file_obj = LabelFile(label_file)
+            self.image_data = self.label_file_obj.imageData
+            assert self.label_file_obj.imagePath
+            self.image_path = osp.join(
+                osp.dirname(label_file), self.label_file_obj.imagePath
+            )
+        else:
+            loaded = LabelFile.load_image_file_and_image(filename)
+            if loaded is not None:
+                self.image_data, image_pil = loaded
+                self.image_path = filename
+
+        self.image = QtGui.QImage()
+        self.image_key = ""
+        if self.image_data:
+            if image_pil is not None:
+                self.image = _pil_to_qimage(image_pil)
+            if self.image.isNull():
+                self.image = QtGui.QImage.fromData(self.image_data)
+            # content key of the image for the embedding cache
+            self.image_key = hashlib.blake2b(
+                self.image_data, digest_size=16
+            ).hexdigest()
+
+    def _get_mtimes(self) -> tuple[int | None, int | None]:
+        return _get_mtime_ns(self.filename), _get_mtime_ns(self.label_file)
+
+    def is_stale(self) -> bool:
+        return self._get_mtimes() != self._mtimes
+
+    @property
+    def nbytes(self) -> int:
+        return self.image.sizeInBytes() + len(self.image_data or b"")
+
+
+class _ImagePreloadSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(object)
+    error = QtCore.pyqtSignal(object)
+
+
+class _ImagePreloadRunnable(QtCore.QRunnable):
+    def __init__(self, filename: str, label_file: str, signals: _ImagePreloadSignals):
+        super().__init__()
+        self.filename = filename
+        self.label_file = label_file
+        self.signals = signals
+
+    def run(self):
+        try:
+            loaded = LoadedImage(filename=self.filename, label_file=self.label_file)
+        except Exception as e:
+            # errors are reported when the file is opened
+            logger.debug("Failed to preload {!r}: {}", self.filename, e)
+            self.signals.error.emit((self.filename, self.label_file))
+            return
+        self.signals.finished.emit(loaded)
+
+
+class ImagePreloader(QtCore.QObject):
+    """
+    Reads and decodes images ahead of time into a bounded LRU.
+
+    Images are loaded on a worker pool and kept on the GUI thread, least
+    recently used first out, while their decoded size exceeds the budget.
+
+    Args:
+        max_size_bytes: Budget for the decoded images and their file data
+        parent: Parent object
+    """
+
+    def __init__(self, max_size_bytes: int, parent: QtCore.QObject | None = None):
+        super().__init__(parent)
+        self.max_size_bytes = max_size_bytes
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+        self._pending: set[tuple[str, str]] = set()
+        self._signals = _ImagePreloadSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.error.connect(self._pending.discard)
+        self._cache: collections.OrderedDict[tuple[str, str], LoadedImage] = (
+            collections.OrderedDict()
+        )
+        self._size_bytes = 0
+
+    def get(self, filename: str, label_file: str) -> LoadedImage | None:
+        """Return a loaded image from the cache, unless it has changed since."""
+        key = (filename, label_file)
+        loaded = self._cache.get(key)
+        if loaded is None:
+            return None
+        if loaded.is_stale():
+            del self._cache[key]
+            self._size_bytes -= loaded.nbytes
+            logger.debug("Discarded stale preloaded image {!r}", filename)
+            return None
+        # kept for going back and forth, and evicted by the size budget
+        self._cache.move_to_end(key)
+        return loaded
+
+    def preload(self, files: list[tuple[str, str]]) -> None:
+        """
+        Load images in the background, cancelling earlier queued requests.
+
+        Args:
+            files: Pairs of image file and label file, in order of priority
+        """
+        self.cancel()
+        for filename, label_file in files:
+            key = (filename, label_file)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                continue
+            if key in self._pending:
+                continue
+            self._pending.add(key)
+            self._pool.start(
+                _ImagePreloadRunnable(
+                    filename=filename,
+                    label_file=label_file,
+                    signals=self._signals,
+                )
+            )
+
+    def cancel(self) -> None:
+        # loads in progress still finish and are cached
+        self._pool.clear()
+        self._pending.clear()
+
+    def clear(self) -> None:
+        self.cancel()
+        self._cache.clear()
+        self._size_bytes = 0
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+    def _on_finished(self, loaded: LoadedImage) -> None:
+        key = (loaded.filename, loaded.label_file)
+        self._pending.discard(key)
+        if key in self._cache or loaded.nbytes > self.max_size_bytes:
+            return
+        self._cache[key] = loaded
+        self._size_bytes += loaded.nbytes
+        while self._size_bytes > self.max_size_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._size_bytes -= evicted.nbytes
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import os.path as osp
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from typing import Any
+
+from loguru import logger
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+
+
+def get_image_extensions() -> tuple[str, ...]:
+    """Return the lowercase file extensions of the readable image formats."""
+    return tuple(
+        f".{fmt.data().decode().lower()}"
+        for fmt in QtGui.QImageReader.supportedImageFormats()
+    )
+
+
+def _scan_dir(dirpath: str, extensions: tuple[str, ...]) -> tuple[list[str], list[str]]:
+    files: list[str] = []
+    subdirs: list[str] = []
+    try:
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                # symlinks to directories are not followed as in os.walk
+                if is_dir:
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    files.append(osp.normpath(entry.path))
+    except OSError as e:
+        logger.warning("Failed to scan {!r}: {}", dirpath, e)
+    return files, subdirs
+
+
+def iter_image_files(
+    dirpath: str,
+    extensions: tuple[str, ...],
+    max_workers: int = 8,
+    batch_interval: float = 0.1,
+    max_batch_size: int = 1000,
+    cancelled: threading.Event | None = None,
+) -> Iterator[list[str]]:
+    """
+    Find image files under a directory, scanning subdirectories in parallel.
+
+    Args:
+        dirpath: Directory to scan recursively
+        extensions: Lowercase file extensions of the images, e.g. (".jpg",)
+        max_workers: Number of directories scanned at once
+        batch_interval: Seconds over which found files are batched
+        max_batch_size: Maximum number of files in a batch
+        cancelled: Stops the scan when set
+
+    Yields:
+        Batches of image files, in no particular order
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(_scan_dir, dirpath, extensions)}
+        batch: list[str] = []
+        t_batch = time.monotonic()
+        while pending:
+            if cancelled is not None and cancelled.is_set():
+                return
+            done, pending = concurrent.futures.wait(
+                pending,
+                timeout=batch_interval,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                files, subdirs = future.result()
+                batch.extend(files)
+                pending.update(
+                    executor.submit(_scan_dir, subdir, extensions) for subdir in subdirs
+                )
+            while len(batch) >= max_batch_size:
+                yield batch[:max_batch_size]
+                batch = batch[max_batch_size:]
+                t_batch = time.monotonic()
+            if batch and (not pending or time.monotonic() - t_batch >= batch_interval):
+                yield batch
+                batch = []
+                t_batch = time.monotonic()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _ImageScanSignals(QtCore.QObject):
+    batchFound = QtCore.pyqtSignal(int, list, list)
+    finished = QtCore.pyqtSignal(int)
+
+
+class _ImageScanRunnable(QtCore.QRunnable):
+    def __init__(
+        self,
+        generation: int,
+        dirpath: str,
+        extensions: tuple[str, ...],
+        sort_key: Callable[[str], Any],
+        cancelled: threading.Event,
+        signals: _ImageScanSignals,
+    ):
+        super().__init__()
+        self.generation = generation
+        self.dirpath = dirpath
+        self.extensions = extensions
+        self.sort_key = sort_key
+        self.cancelled = cancelled
+        self.signals = signals
+
+    def run(self):
+        t_start = time.monotonic()
+        num_files = 0
+        try:
+            for files in iter_image_files(
+                self.dirpath, extensions=self.extensions, cancelled=self.cancelled
+            ):
+                num_files += len(files)
+                sort_keys = [self.sort_key(filename) for filename in files]
+                self.signals.batchFound.emit(self.generation, files, sort_keys)
+        except Exception as e:
+            logger.error("Exception occurred in image scan: {}", e)
+        logger.debug(
+            "Found {} images in {!r} in {:.3f}s",
+            num_files,
+            self.dirpath,
+            time.monotonic() - t_start,
+        )
+        self.signals.finished.emit(self.generation)
+
+
+class ImageScanner(QtCore.QObject):
+    """
+    Scans a directory for images in the background.
+
+    Found files are emitted in batches as they are found, so that they can be
+    listed before the scan of a large or network-mounted directory finishes.
+    Starting a scan cancels the previous one, whose batches are then dropped.
+
+    Args:
+        sort_key: Sort key of the files, computed off the GUI thread as it
+            can be slow, e.g. for natural sort
+        parent: Parent object
+    """
+
+    # files, and their sort keys
+    batchFound = QtCore.pyqtSignal(list, list)
+    finished = QtCore.pyqtSignal()
+
+    def __init__(
+        self,
+        sort_key: Callable[[str], Any],
+        parent: QtCore.QObject | None = None,
+    ):
+        super().__init__(parent)
+        self.sort_key = sort_key
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _ImageScanSignals(self)
+        self._signals.batchFound.connect(self._on_batch_found)
+        self._signals.finished.connect(self._on_finished)
+        self._generation = 0
+        self._cancelled = threading.Event()
+
+    def start(self, dirpath: str) -> None:
+        self.cancel()
+        self._cancelled = threading.Event()
+        self._pool.start(
+            _ImageScanRunnable(
+                generation=self._generation,
+                dirpath=dirpath,
+                extensions=get_image_extensions(),
+                sort_key=self.sort_key,
+                cancelled=self._cancelled,
+                signals=self._signals,
+            )
+        )
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        self._generation += 1
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+    def _on_batch_found(
+        self, generation: int, files: list[str], sort_keys: list[Any]
+    ) -> None:
+        if generation == self._generation:
+            self.batchFound.emit(files, sort_keys)
+
+    def _on_finished(self, generation: int) -> None:
+        if generation == self._generation:
+            self.finished.emit()
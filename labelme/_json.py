@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import math
+from typing import Any
+from typing import Literal
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+Backend = Literal["orjson", "json"]
+
+_backend: Backend = "json" if orjson is None else "orjson"
+
+# digits mapped to "0", to find integers that may be beyond 64 bits, which
+# orjson reads as floats; much faster than a regex search
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"0" * 9)
+_LONG_DIGITS = b"0" * 19
+# scanned a window at a time, not to copy the whole input
+_SCAN_WINDOW_SIZE = 1 << 16
+
+
+def get_backend() -> Backend:
+    return _backend
+
+
+def set_backend(backend: Backend) -> None:
+    """
+    Select the library used by loads and dumps.
+
+    By default, orjson is used if it is installed and the stdlib json module
+    otherwise.
+    """
+    global _backend
+    if backend not in ["orjson", "json"]:
+        raise ValueError(f"Unsupported JSON backend: {backend!r}")
+    if backend == "orjson" and orjson is None:
+        raise ImportError("orjson is not installed")
+    _backend = backend
+
+
+def _has_long_digits(s: str | bytes) -> bool:
+    # overlapping by one digit short of a match, not to miss one across windows
+    overlap = len(_LONG_DIGITS) - 1
+    for start in range(0, len(s), _SCAN_WINDOW_SIZE):
+        window = s[start : start + _SCAN_WINDOW_SIZE + overlap]
+        if isinstance(window, str):
+            window = window.encode("utf-8")
+        if _LONG_DIGITS in window.translate(_DIGITS_TO_ZERO):
+            return True
+    return False
+
+
+def loads(s: str | bytes) -> Any:
+    """
+    Deserialize JSON.
+
+    Inputs that orjson does not read as json does, i.e. NaN, Infinity and
+    integers beyond 64 bits, are read with json.
+    """
+    if _backend == "orjson":
+        if not _has_long_digits(s):
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError as e:
+                # e.g. NaN, and raised again by json if the input is invalid
+                logger.debug("Falling back to json for unsupported input: {}", e)
+    return json.loads(s)
+
+
+def _has_non_finite_float(obj: Any) -> bool:
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, float):
+            if not math.isfinite(obj):
+                return True
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+
+def dumps(obj: Any, indent: bool = True) -> str:
+    """
+    Serialize an object to JSON.
+
+    Args:
+        obj: Object to serialize
+        indent: Indent by 2 spaces as json.dumps(obj, indent=2), or write
+            compactly without any whitespace for machine-consumed outputs
+
+    Returns:
+        JSON with non-ASCII characters unescaped, and NaN and Infinity
+        written as by json
+    """
+    # orjson writes NaN and Infinity as null
+    if _backend == "orjson" and not _has_non_finite_float(obj):
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_INDENT_2 if indent else None
+            ).decode("utf-8")
+        except TypeError as e:
+            # e.g. integers beyond 64 bits
+            logger.debug("Falling back to json for unsupported input: {}", e)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import json
+import re
+from collections.abc import Collection
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import IO
+from typing import Any
+
+from labelme import _json
+
+_INDENT = "  "
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# body of a JSON string up to its closing quote, or to the end of the buffer
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_DECODER = json.JSONDecoder()
+# "" as well, for a number at the end of the buffer
+_NUMBER_CHARS = set("0123456789+-.eE") | {""}
+
+
+def _dumps(value: Any, level: int) -> str:
+    text: str = _json.dumps(value, indent=True)
+    # strings are escaped, so every newline is indentation
+    return text.replace("\n", "\n" + _INDENT * level)
+
+
+def dump(
+    data: dict[str, Any],
+    f: IO[str],
+    stream_keys: Collection[str] = (),
+    indent: bool = True,
+) -> None:
+    """
+    Write a JSON object as _json.dumps(data, indent=indent) would.
+
+    The values at `stream_keys` may be any iterable, e.g. a generator, and
+    are written as arrays one item at a time, so their items never need to
+    be in memory together.
+    """
+    if not indent:
+        _dump_compact(data=data, f=f, stream_keys=stream_keys)
+        return
+    if not data:
+        f.write("{}")
+        return
+    for i, (key, value) in enumerate(data.items()):
+        f.write(",\n" if i else "{\n")
+        f.write(f"{_INDENT}{_dumps(key, level=1)}: ")
+        if key in stream_keys:
+            _dump_array(items=value, f=f)
+        else:
+            f.write(_dumps(value, level=1))
+    f.write("\n}")
+
+
+def _dump_array(items: Iterable[Any], f: IO[str]) -> None:
+    is_empty = True
+    for item in items:
+        f.write("[\n" if is_empty else ",\n")
+        f.write(f"{_INDENT * 2}{_dumps(item, level=2)}")
+        is_empty = False
+    f.write("[]" if is_empty else f"\n{_INDENT}]")
+
+
+def _dump_compact(
+    data: dict[str, Any], f: IO[str], stream_keys: Collection[str]
+) -> None:
+    f.write("{")
+    for i, (key, value) in enumerate(data.items()):
+        f.write(f"{',' if i else ''}{_json.dumps(key, indent=False)}:")
+        if key in stream_keys:
+            f.write("[")
+            for j, item in enumerate(value):
+                f.write(f"{',' if j else ''}{_json.dumps(item, indent=False)}")
+            f.write("]")
+        else:
+            f.write(_json.dumps(value, indent=False))
+    f.write("}")
+
+
+class _Reader:
+    def __init__(self, f: IO[str], chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+
+    def _read_more(self, size: int) -> bool:
+        # drop consumed text, so that the buffer stays bounded
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        chunk: str = self._f.read(size)
+        self._buffer += chunk
+        return bool(chunk)
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or '' at the end."""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()  # type: ignore[union-attr]
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more(self._chunk_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self._error(f"Expecting {char!r}")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # the value may be cut off at the end of the buffer
+                if self._read_more(size):
+                    size *= 2  # avoid re-decoding large values too often
+                    continue
+                raise
+            # so may a number, even though a prefix of it decodes
+            if (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and self._buffer[end : end + 1] in _NUMBER_CHARS
+                and self._read_more(size)
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def skip(self) -> None:
+        if self.peek() != '"':
+            self.decode()
+            return
+        # strings such as imageData are skipped without decoding them
+        self._pos += 1
+        while True:
+            self._pos = _STRING_BODY.match(self._buffer, self._pos).end()  # type: ignore[union-attr]
+            if self._pos < len(self._buffer) and self._buffer[self._pos] == '"':
+                self._pos += 1
+                return
+            if not self._read_more(self._chunk_size):
+                raise self._error("Unterminated string")
+
+
+def iter_array_items(f: IO[str], key: str, chunk_size: int = 1024**2) -> Iterator[Any]:
+    """
+    Yield the items of the array at `key` of a top-level JSON object.
+
+    The file is read incrementally, one item is decoded at a time, and the
+    values of other keys are skipped. Raises KeyError if there is no such
+    key, and json.JSONDecodeError on malformed input.
+    """
+    reader = _Reader(f=f, chunk_size=chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        raise KeyError(key)
+    while True:
+        name = reader.decode()
+        reader.expect(":")
+        if name == key:
+            break
+        reader.skip()
+        if reader.peek() == "}":
+            raise KeyError(key)
+        reader.expect(",")
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.decode()
+        if reader.peek() == "]":
+            return
+        reader.expect(",")
@@ -1,9 +1,14 @@
 import base64
 import builtins
 import contextlib
+import functools
 import io
-import json
+import os
 import os.path as osp
+import shutil
+import uuid
+from collections.abc import Iterator
+from typing import Callable
 from typing import Optional
 from typing import TypedDict
 
@@ -13,6 +18,8 @@ from loguru import logger
 from numpy.typing import NDArray
 
 from labelme import __version__
+from labelme import _json
+from labelme import _json_stream
 from labelme import utils
 
 PIL.Image.MAX_IMAGE_PIXELS = None
@@ -100,10 +107,13 @@ def _load_shape_json_obj(shape_json_obj: dict) -> ShapeDict:
 
     mask: Optional[NDArray[np.bool]] = None
     if shape_json_obj.get("mask") is not None:
-        assert isinstance(shape_json_obj["mask"], str), (
-            f"mask must be base64-encoded PNG: {shape_json_obj['mask']}"
+        assert isinstance(shape_json_obj["mask"], (str, dict)), (
+            f"mask must be base64-encoded PNG or COCO RLE: {shape_json_obj['mask']}"
         )
-        mask = utils.img_b64_to_arr(shape_json_obj["mask"]).astype(bool)
+        if isinstance(shape_json_obj["mask"], dict):
+            mask = utils.rle_to_mask(shape_json_obj["mask"])
+        else:
+            mask = utils.img_b64_to_arr(shape_json_obj["mask"]).astype(bool)
 
     other_data = {k: v for k, v in shape_json_obj.items() if k not in SHAPE_KEYS}
 
@@ -132,36 +142,96 @@ class LabelFile:
     shapes: list[ShapeDict]
     suffix = ".json"
 
-    def __init__(self, filename=None):
+    _imageData: Optional[bytes]
+    _load_image_data: Optional[Callable[[], bytes]]
+
+    def __init__(self, filename=None, lazy_image_data=False):
         self.shapes = []
         self.imagePath = None
         self.imageData = None
         if filename is not None:
-            self.load(filename)
+            self.load(filename, lazy_image_data=lazy_image_data)
         self.filename = filename
 
+    @property
+    def imageData(self) -> Optional[bytes]:
+        if self._load_image_data is not None:
+            load_image_data, self._load_image_data = self._load_image_data, None
+            try:
+                self._imageData = load_image_data()
+            except Exception as e:
+                raise LabelFileError(e)
+        return self._imageData
+
+    @imageData.setter
+    def imageData(self, value: Optional[bytes]) -> None:
+        self._imageData = value
+        self._load_image_data = None
+
     @staticmethod
     def load_image_file(filename):
+        loaded = LabelFile.load_image_file_and_image(filename)
+        if loaded is None:
+            return None
+        return loaded[0]
+
+    @staticmethod
+    def load_image_file_and_image(
+        filename,
+    ) -> Optional[tuple[bytes, Optional[PIL.Image.Image]]]:
+        """
+        Read an image file as JPEG or PNG data, re-encoding it if needed.
+
+        If the data is re-encoded as PNG, which is lossless, the oriented
+        image it was encoded from is also returned, so that its pixels can be
+        used without decoding the data again, and None otherwise.
+        """
         try:
-            image_pil = PIL.Image.open(filename)
+            with builtins.open(filename, "rb") as f:
+                image_data = f.read()
+            image_pil = PIL.Image.open(io.BytesIO(image_data))
         except OSError:
             logger.error(f"Failed opening image file: {filename}")
-            return
+            return None
+
+        ext = osp.splitext(filename)[1].lower()
+        if ext in [".jpg", ".jpeg"]:
+            format = "JPEG"
+        else:
+            format = "PNG"
 
         # apply orientation to image according to exif
-        image_pil = utils.apply_exif_orientation(image_pil)
+        oriented_image_pil = utils.apply_exif_orientation(image_pil)
+
+        if oriented_image_pil is image_pil and image_pil.format == format:
+            # the file is already what re-encoding would produce, minus the
+            # decode, encode and generation loss
+            return image_data, None
 
         with io.BytesIO() as f:
-            ext = osp.splitext(filename)[1].lower()
-            if ext in [".jpg", ".jpeg"]:
-                format = "JPEG"
-            else:
-                format = "PNG"
-            image_pil.save(f, format=format)
+            oriented_image_pil.save(f, format=format)
             f.seek(0)
-            return f.read()
-
-    def load(self, filename):
+            image_data = f.read()
+        return image_data, oriented_image_pil if format == "PNG" else None
+
+    @classmethod
+    def load_shapes_only(cls, filename) -> "LabelFile":
+        """
+        Load the shapes, flags and other metadata of a label file.
+
+        The image is not read; imageData is only decoded or loaded from
+        imagePath if it is accessed later.
+        """
+        return cls(filename, lazy_image_data=True)
+
+    def load(self, filename, lazy_image_data=False):
+        """
+        Load a label file.
+
+        With `lazy_image_data`, the image is neither decoded nor read from
+        imagePath until `imageData` is first accessed, which then raises
+        LabelFileError on failure.
+        """
         keys = [
             "version",
             "imageData",
@@ -172,22 +242,20 @@ class LabelFile:
             "imageWidth",
         ]
         try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-
-            if data["imageData"] is not None:
-                imageData = base64.b64decode(data["imageData"])
-            else:
-                # relative path from label file to relative path from cwd
-                imagePath = osp.join(osp.dirname(filename), data["imagePath"])
-                imageData = self.load_image_file(imagePath)
+            with builtins.open(filename, "rb") as f:
+                data = _json.loads(f.read())
+
+            load_image_data = functools.partial(
+                self._load_image_data_from_json,
+                filename=filename,
+                imageData=data["imageData"],
+                imagePath=data["imagePath"],
+                imageHeight=data.get("imageHeight"),
+                imageWidth=data.get("imageWidth"),
+            )
+            imageData = None if lazy_image_data else load_image_data()
             flags = data.get("flags") or {}
             imagePath = data["imagePath"]
-            self._check_image_height_and_width(
-                base64.b64encode(imageData).decode("utf-8"),
-                data.get("imageHeight"),
-                data.get("imageWidth"),
-            )
             shapes: list[ShapeDict] = [
                 _load_shape_json_obj(shape_json_obj=s) for s in data["shapes"]
             ]
@@ -204,24 +272,55 @@ class LabelFile:
         self.shapes = shapes
         self.imagePath = imagePath
         self.imageData = imageData
+        if lazy_image_data:
+            self._load_image_data = load_image_data
         self.filename = filename
         self.otherData = otherData
 
+    @classmethod
+    def _load_image_data_from_json(
+        cls, filename, imageData, imagePath, imageHeight, imageWidth
+    ):
+        if imageData is not None:
+            imageData = base64.b64decode(imageData)
+        else:
+            # relative path from label file to relative path from cwd
+            imageData = cls.load_image_file(osp.join(osp.dirname(filename), imagePath))
+        cls._check_image_height_and_width(imageData, imageHeight, imageWidth)
+        return imageData
+
+    @staticmethod
+    def iter_shapes(filename) -> Iterator[ShapeDict]:
+        """
+        Yield the shapes of a label file one at a time.
+
+        The file is read incrementally and imageData is skipped, so memory
+        use is bounded by the largest shape rather than the file size.
+        """
+        try:
+            with open(filename, "r") as f:
+                for shape_json_obj in _json_stream.iter_array_items(f, key="shapes"):
+                    yield _load_shape_json_obj(shape_json_obj=shape_json_obj)
+        except Exception as e:
+            raise LabelFileError(e)
+
     @staticmethod
     def _check_image_height_and_width(imageData, imageHeight, imageWidth):
-        img_arr = utils.img_b64_to_arr(imageData)
-        if imageHeight is not None and img_arr.shape[0] != imageHeight:
+        # only the image header is read, the pixels are not decoded
+        with PIL.Image.open(io.BytesIO(imageData)) as image_pil:
+            width, height = image_pil.size
+        if imageHeight is not None and height != imageHeight:
             logger.error(
                 "imageHeight does not match with imageData or imagePath, "
                 "so getting imageHeight from actual image."
             )
-            imageHeight = img_arr.shape[0]
-        if imageWidth is not None and img_arr.shape[1] != imageWidth:
+            imageHeight = height
+        if imageWidth is not None and width != imageWidth:
             logger.error(
                 "imageWidth does not match with imageData or imagePath, "
                 "so getting imageWidth from actual image."
             )
-            imageWidth = img_arr.shape[1]
+            imageWidth = width
         return imageHeight, imageWidth
 
     def save(
@@ -234,12 +333,19 @@ class LabelFile:
         imageData=None,
         otherData=None,
         flags=None,
+        compact=False,
     ):
+        """
+        Save a label file.
+
+        `shapes` may be any iterable of shape dicts. With `compact`, the JSON
+        is written without indentation, for outputs read only by programs.
+        """
         if imageData is not None:
-            imageData = base64.b64encode(imageData).decode("utf-8")
             imageHeight, imageWidth = self._check_image_height_and_width(
                 imageData, imageHeight, imageWidth
             )
+            imageData = base64.b64encode(imageData).decode("utf-8")
         if otherData is None:
             otherData = {}
         if flags is None:
@@ -256,11 +362,24 @@ class LabelFile:
         for key, value in otherData.items():
             assert key not in data
             data[key] = value
+        # written to a temporary file first, as shapes may be an iterable that
+        # formats each shape on demand and fails midway, which would otherwise
+        # leave the existing file truncated
+        target_file = osp.realpath(filename)
+        tmp_file = osp.join(
+            osp.dirname(target_file),
+            f".{osp.basename(target_file)}.{uuid.uuid4().hex}.tmp",
+        )
         try:
-            with open(filename, "w") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with builtins.open(tmp_file, "x", encoding="utf-8") as f:
+                _json_stream.dump(data, f, stream_keys=("shapes",), indent=not compact)
+            if osp.exists(target_file):
+                shutil.copymode(target_file, tmp_file)
+            os.replace(tmp_file, target_file)
             self.filename = filename
         except Exception as e:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_file)
             raise LabelFileError(e)
 
     @staticmethod
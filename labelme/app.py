@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import functools
 import html
 import math
@@ -8,6 +9,8 @@ import os.path as osp
 import re
 import types
 import webbrowser
+from collections.abc import Callable
+from typing import Literal
 
 import imgviz
 import natsort
@@ -24,6 +27,14 @@ from PyQt5.QtWidgets import QMessageBox
 from labelme import __appname__
 from labelme import __version__
 from labelme._automation import bbox_from_text
+from labelme._automation import embedding_cache
+from labelme._ground_truth import load_ground_truth
+from labelme._image_preloader import ImagePreloader
+from labelme._image_preloader import LoadedImage
+from labelme._image_preloader import get_label_file
+from labelme._image_scanner import ImageScanner
+from labelme._image_scanner import get_image_extensions
+from labelme._image_scanner import iter_image_files
 from labelme._label_file import LabelFile
 from labelme._label_file import LabelFileError
 from labelme._label_file import ShapeDict
@@ -33,6 +44,7 @@ from labelme.widgets import AiPromptWidget
 from labelme.widgets import BrightnessContrastDialog
 from labelme.widgets import Canvas
 from labelme.widgets import FileDialogPreview
+from labelme.widgets import FileListWidget
 from labelme.widgets import LabelDialog
 from labelme.widgets import LabelListWidget
 from labelme.widgets import LabelListWidgetItem
@@ -43,6 +55,9 @@ from labelme.widgets import download_ai_model
 
 from . import utils
 
+# natural order of file paths, as in the file manager of the OS
+_natsort_key = natsort.os_sort_keygen()
+
 # FIXME
 # - [medium] Set max zoom value to something big enough for FitWidth/Window
 
@@ -170,7 +185,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.fileSearch = QtWidgets.QLineEdit()
         self.fileSearch.setPlaceholderText(self.tr("Search Filename"))
         self.fileSearch.textChanged.connect(self.fileSearchChanged)
-        self.fileListWidget = QtWidgets.QListWidget()
+        # filters once typing pauses rather than on every keystroke
+        self._file_search_timer = QtCore.QTimer(self)
+        self._file_search_timer.setSingleShot(True)
+        self._file_search_timer.setInterval(200)
+        self._file_search_timer.timeout.connect(self.applyFileSearch)
+        self.fileListWidget = FileListWidget()
         self.fileListWidget.itemSelectionChanged.connect(self.fileSelectionChanged)
         fileListLayout = QtWidgets.QVBoxLayout()
         fileListLayout.setContentsMargins(0, 0, 0, 0)
@@ -192,6 +212,22 @@ class MainWindow(QtWidgets.QMainWindow):
             num_backups=self._config["canvas"]["num_backups"],
             crosshair=self._config["canvas"]["crosshair"],
         )
+        if self._config["ai"]["embedding_cache"]["enabled"]:
+            self.canvas.set_embedding_cache(
+                embedding_cache.EmbeddingCache(
+                    cache_dir=self._config["ai"]["embedding_cache"]["dir"]
+                    or embedding_cache.get_default_cache_dir(),
+                    max_size_bytes=self._config["ai"]["embedding_cache"]["max_size_mb"]
+                    * 1024**2,
+                )
+            )
+        self._image_preloader = ImagePreloader(
+            max_size_bytes=self._config["image_preload"]["max_size_mb"] * 1024**2,
+            parent=self,
+        )
+        self._image_scanner = ImageScanner(sort_key=_natsort_key, parent=self)
+        self._image_scanner.batchFound.connect(self._on_image_batch_found)
+        self._image_scan_load = True
         self.canvas.zoomRequest.connect(self.zoomRequest)
         self.canvas.mouseMoved.connect(
             lambda pos: self.status_right.setText(f"x={pos.x():.3f}, y={pos.y():.3f}")
@@ -985,6 +1021,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Application state.
         self.image = QtGui.QImage()
+        self._image_key = ""
         self.labelFile: LabelFile | None = None
         self.imagePath: str | None = None
         self.recentFiles: list[str] = []
@@ -1000,13 +1037,14 @@ class MainWindow(QtWidgets.QMainWindow):
         }  # key=filename, value=scroll_value
 
         if filename is not None and osp.isdir(filename):
-            self.importDirImages(filename, load=False)
+            # the first file is opened once found by the scan
+            self.importDirImages(filename)
         else:
             self.filename = filename
 
         if config["file_search"]:
             self.fileSearch.setText(config["file_search"])
-            self.fileSearchChanged()
+            self.applyFileSearch()
 
         # XXX: Could be completely declarative.
         # Restore application settings.
@@ -1375,26 +1413,33 @@ class MainWindow(QtWidgets.QMainWindow):
                 )
 
     def fileSearchChanged(self):
-        self.importDirImages(
-            self.lastOpenDir,
-            pattern=self.fileSearch.text(),
-            load=False,
+        self._file_search_timer.start()
+
+    def applyFileSearch(self):
+        self._file_search_timer.stop()
+        self.fileListWidget.setFilter(
+            _get_file_search_match(
+                self.fileSearch.text(), mode=self._config["file_search_mode"]
+            )
         )
+        # keep the open file selected if it still matches, without reloading it
+        row = self.fileListWidget.findRow(self.filename) if self.filename else -1
+        if row >= 0:
+            self.fileListWidget.blockSignals(True)
+            self.fileListWidget.setCurrentRow(row)
+            self.fileListWidget.blockSignals(False)
 
     def fileSelectionChanged(self):
-        items = self.fileListWidget.selectedItems()
-        if not items:
+        filenames = self.fileListWidget.selectedFilenames()
+        if not filenames:
             return
-        item = items[0]
 
         if not self.mayContinue():
             return
 
-        currIndex = self.imageList.index(str(item.text()))
-        if currIndex < len(self.imageList):
-            filename = self.imageList[currIndex]
-            if filename:
-                self.loadFile(filename)
+        filename = filenames[0]
+        if filename:
+            self.loadFile(filename)
 
     # React to canvas signals.
     def shapeSelectionChanged(self, selected_shapes):
@@ -1559,7 +1604,7 @@ class MainWindow(QtWidgets.QMainWindow):
                             default_flags[key] = False
             shape.flags = default_flags
             shape.flags.update(shape_dict["flags"])
-            shape.other_data = shape_dict["other_data"]
+            shape.other_data = shape_dict["other_data"].copy()
 
             shapes.append(shape)
         self.loadShapes(shapes=shapes)
@@ -1575,6 +1620,11 @@ class MainWindow(QtWidgets.QMainWindow):
     def saveLabels(self, filename):
         lf = LabelFile()
 
+        def encode_mask(mask):
+            if self._config["mask_format"] == "rle":
+                return utils.mask_to_rle(mask)
+            return utils.img_arr_to_b64(mask.astype(np.uint8))
+
         def format_shape(s):
             data = s.other_data.copy()
             
@@ -1591,12 +1641,14 @@ class MainWindow(QtWidgets.QMainWindow):
                     description=s.description,
                     shape_type=s.shape_type,
                     flags=s.flags,
-                    mask=None if s.mask is None else utils.img_arr_to_b64(s.mask.astype(np.uint8)),
+                    mask=None if s.mask is None else encode_mask(s.mask),
                 )
             )
             return data
 
-        shapes = [format_shape(item.shape()) for item in self.labelList]
+        # formatted one at a time while saving, which keeps encoded masks of
+        # all shapes from being in memory at once
+        shapes = (format_shape(item.shape()) for item in self.labelList)
         flags = {}
         for i in range(self.flag_widget.count()):
             item = self.flag_widget.item(i)
@@ -1627,11 +1679,7 @@ class MainWindow(QtWidgets.QMainWindow):
             )
 
             self.labelFile = lf
-            items = self.fileListWidget.findItems(self.imagePath, Qt.MatchExactly)
-            if len(items) > 0:
-                if len(items) != 1:
-                    raise RuntimeError("There are duplicate files.")
-                items[0].setCheckState(Qt.Checked)
+            self.fileListWidget.setFileChecked(self.imagePath, checked=True)
             # disable allows next and previous image to proceed
             # self.filename = filename
             return True
@@ -1786,18 +1834,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self._config["keep_prev_scale"] = enabled
         self.actions.keepPrevScale.setChecked(enabled)
 
-    def onNewBrightnessContrast(self, qimage):
-        self.canvas.loadPixmap(QtGui.QPixmap.fromImage(qimage), clear_shapes=False)
+    def onNewBrightnessContrast(self, qimage, image_key=None):
+        self.canvas.loadPixmap(
+            QtGui.QPixmap.fromImage(qimage), clear_shapes=False, image_key=image_key
+        )
 
     def brightnessContrast(self, value: bool, is_initial_load: bool = False):
         del value
 
-        dialog = BrightnessContrastDialog(
-            utils.img_data_to_pil(self.imageData).convert("RGB"),
-            self.onNewBrightnessContrast,
-            parent=self,
-        )
-
         brightness, contrast = self.brightnessContrast_values.get(
             self.filename, (None, None)
         )
@@ -1807,6 +1851,28 @@ class MainWindow(QtWidgets.QMainWindow):
                 brightness, contrast = self.brightnessContrast_values.get(
                     prev_filename, (None, None)
                 )
+            if BrightnessContrastDialog.isDefaultValue(brightness, contrast):
+                # the loaded pixmap is the image as is, keyed by its content
+                self.brightnessContrast_values[self.filename] = (brightness, contrast)
+                return
+
+        image_key = self._image_key
+
+        def get_image_key() -> str:
+            brightness = dialog.slider_brightness.value()
+            contrast = dialog.slider_contrast.value()
+            if BrightnessContrastDialog.isDefaultValue(brightness, contrast):
+                return image_key
+            return f"{image_key}:brightness_contrast={brightness},{contrast}"
+
+        dialog = BrightnessContrastDialog(
+            utils.img_data_to_pil(self.imageData).convert("RGB"),
+            lambda qimage: self.onNewBrightnessContrast(
+                qimage, image_key=get_image_key()
+            ),
+            parent=self,
+        )
+
         if brightness is not None:
             dialog.slider_brightness.setValue(brightness)
         if contrast is not None:
@@ -1831,10 +1897,9 @@ class MainWindow(QtWidgets.QMainWindow):
     def loadFile(self, filename=None):
         """Load the specified file, or the last opened file if None."""
         # changing fileListWidget loads file
-        if filename in self.imageList and (
-            self.fileListWidget.currentRow() != self.imageList.index(filename)
-        ):
-            self.fileListWidget.setCurrentRow(self.imageList.index(filename))
+        row = self.fileListWidget.findRow(filename) if filename is not None else -1
+        if row >= 0 and self.fileListWidget.currentRow() != row:
+            self.fileListWidget.setCurrentRow(row)
             self.fileListWidget.repaint()
             return
 
@@ -1851,13 +1916,12 @@ class MainWindow(QtWidgets.QMainWindow):
             return False
         # assumes same name, but json extension
         self.show_status_message(self.tr("Loading %s...") % osp.basename(str(filename)))
-        label_file = f"{osp.splitext(filename)[0]}.json"
-        if self.output_dir:
-            label_file_without_path = osp.basename(label_file)
-            label_file = osp.join(self.output_dir, label_file_without_path)
-        if QtCore.QFile.exists(label_file) and LabelFile.is_label_file(label_file):
+        label_file = get_label_file(filename=filename, output_dir=self.output_dir)
+        # read ahead while the neighboring image was shown
+        loaded = self._image_preloader.get(filename=filename, label_file=label_file)
+        if loaded is None:
             try:
-                self.labelFile = LabelFile(label_file)
+                loaded = LoadedImage(filename=filename, label_file=label_file)
             except LabelFileError as e:
                 self.errorMessage(
                     self.tr("Error opening file"),
@@ -1868,21 +1932,14 @@ class MainWindow(QtWidgets.QMainWindow):
                 )
                 self.show_status_message(self.tr("Error reading %s") % label_file)
                 return False
-            assert self.labelFile is not None
-            self.imageData = self.labelFile.imageData
-            assert self.labelFile.imagePath
-            self.imagePath = osp.join(
-                osp.dirname(label_file),
-                self.labelFile.imagePath,
-            )
-            self.otherData = self.labelFile.otherData
-        else:
-            self.imageData = LabelFile.load_image_file(filename)
-            if self.imageData:
-                self.imagePath = filename
-            self.labelFile = None
-        assert self.imageData is not None
-        image = QtGui.QImage.fromData(self.imageData)
+        self.labelFile = loaded.label_file_obj
+        self.imageData = loaded.image_data
+        if loaded.image_path:
+            self.imagePath = loaded.image_path
+        if self.labelFile:
+            # not to edit the one kept by the preloader
+            self.otherData = copy.deepcopy(self.labelFile.otherData)
+        image = loaded.image
 
         if image.isNull():
             formats = [
@@ -1902,7 +1959,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.filename = filename
         if self._config["keep_prev"]:
             prev_shapes = self.canvas.shapes
-        self.canvas.loadPixmap(QtGui.QPixmap.fromImage(image))
+        self._image_key = loaded.image_key
+        self.canvas.loadPixmap(
+            QtGui.QPixmap.fromImage(image), image_key=self._image_key
+        )
+        self._preload_images()
+        self._prefetch_image_embeddings()
         flags = {k: False for k in self._config["flags"] or []}
         
         
@@ -2007,6 +2069,48 @@ class MainWindow(QtWidgets.QMainWindow):
         w = self.centralWidget().width() - 2.0
         return w / self.canvas.pixmap.width()
 
+    def _preload_images(self) -> None:
+        num_images: int = self._config["image_preload"]["num_images"]
+        filenames: list[str] = []
+        image_list = self.imageList
+        index = self.fileListWidget.findRow(self.filename) if self.filename else -1
+        if num_images > 0 and index >= 0:
+            for offset in range(1, num_images + 1):
+                # next first, as that is the usual direction
+                for i in [index + offset, index - offset]:
+                    if 0 <= i < len(image_list):
+                        filenames.append(image_list[i])
+        self._image_preloader.preload(
+            files=[
+                (
+                    filename,
+                    get_label_file(filename=filename, output_dir=self.output_dir),
+                )
+                for filename in filenames
+            ]
+        )
+
+    def _prefetch_image_embeddings(self) -> None:
+        num_images: int = 0
+        if self._config["ai"]["embedding_prefetch"]["enabled"]:
+            num_images = self._config["ai"]["embedding_prefetch"]["num_images"]
+        filenames: list[str] = []
+        index = self.fileListWidget.findRow(self.filename) if self.filename else -1
+        if num_images > 0 and index >= 0:
+            filenames = self.imageList[index + 1 : index + 1 + num_images]
+        self.canvas.prefetch_image_embeddings(
+            load_images=[
+                functools.partial(
+                    _load_image_for_embedding,
+                    filename=filename,
+                    label_file=get_label_file(
+                        filename=filename, output_dir=self.output_dir
+                    ),
+                )
+                for filename in filenames
+            ]
+        )
+
     def enableSaveImageWithData(self, enabled):
         self._config["store_data"] = enabled
         self.actions.saveWithImageData.setChecked(enabled)
@@ -2014,11 +2118,19 @@ class MainWindow(QtWidgets.QMainWindow):
     def closeEvent(self, event):
         if not self.mayContinue():
             event.ignore()
+            return
         self.settings.setValue("filename", self.filename if self.filename else "")
         self.settings.setValue("window/size", self.size())
         self.settings.setValue("window/position", self.pos())
         self.settings.setValue("window/state", self.saveState())
         self.settings.setValue("recentFiles", self.recentFiles)
+        self.canvas.cancel_background_tasks()
+        self.fileListWidget.cancelLabelFileChecks()
+        self._image_preloader.cancel()
+        self._image_scanner.cancel()
+        # before the thread pools are destroyed, which would block holding the GIL
+        self._image_preloader.wait()
+        self._image_scanner.wait()
         # ask the use for where to save the labels
         # self.settings.setValue('window/geometry', self.saveGeometry())
 
@@ -2063,7 +2175,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.filename is None:
             return
 
-        currIndex = self.imageList.index(self.filename)
+        currIndex = self.fileListWidget.findRow(self.filename)
         if currIndex - 1 >= 0:
             filename = self.imageList[currIndex - 1]
             if filename:
@@ -2088,7 +2200,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.filename is None:
             filename = self.imageList[0]
         else:
-            currIndex = self.imageList.index(self.filename)
+            currIndex = self.fileListWidget.findRow(self.filename)
             if currIndex + 1 < len(self.imageList):
                 filename = self.imageList[currIndex + 1]
             else:
@@ -2151,13 +2263,13 @@ class MainWindow(QtWidgets.QMainWindow):
         )
         self.statusBar().show()
 
-        current_filename = self.filename
-        self.importDirImages(self.lastOpenDir, load=False)
-
-        if current_filename in self.imageList:
-            # retain currently selected file
-            self.fileListWidget.setCurrentRow(self.imageList.index(current_filename))
-            self.fileListWidget.repaint()
+        # the files are the same, but their label files are not
+        self.fileListWidget.setLabelFiles(
+            {
+                filename: get_label_file(filename=filename, output_dir=self.output_dir)
+                for filename in self.fileListWidget.allFilenames()
+            }
+        )
 
     def saveFile(self, _value=False):
         assert not self.image.isNull(), "cannot save empty image"
@@ -2239,9 +2351,7 @@ class MainWindow(QtWidgets.QMainWindow):
             os.remove(label_file)
             logger.info(f"Label file is removed: {label_file}")
 
-            item = self.fileListWidget.currentItem()
-            if item:
-                item.setCheckState(Qt.Unchecked)
+            self.fileListWidget.setFileChecked(self.filename, checked=False)
 
             self.resetState()
 
@@ -2352,12 +2462,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
     @property
     def imageList(self) -> list[str]:
-        lst = []
-        for i in range(self.fileListWidget.count()):
-            item = self.fileListWidget.item(i)
-            assert item
-            lst.append(item.text())
-        return lst
+        # not a copy, so it must not be modified
+        return self.fileListWidget.filenames()
 
     def importDroppedImageFiles(self, imageFiles):
         extensions = [
@@ -2367,19 +2473,14 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.filename = None
         for file in imageFiles:
-            if file in self.imageList or not file.lower().endswith(tuple(extensions)):
+            if self.fileListWidget.hasFile(file) or not file.lower().endswith(
+                tuple(extensions)
+            ):
                 continue
-            label_file = f"{osp.splitext(file)[0]}.json"
-            if self.output_dir:
-                label_file_without_path = osp.basename(label_file)
-                label_file = osp.join(self.output_dir, label_file_without_path)
-            item = QtWidgets.QListWidgetItem(file)
-            item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            if QtCore.QFile.exists(label_file) and LabelFile.is_label_file(label_file):
-                item.setCheckState(Qt.Checked)
-            else:
-                item.setCheckState(Qt.Unchecked)
-            self.fileListWidget.addItem(item)
+            self.fileListWidget.addFile(
+                file,
+                label_file=get_label_file(filename=file, output_dir=self.output_dir),
+            )
 
         if len(self.imageList) > 1:
             self.actions.openNextImg.setEnabled(True)
@@ -2387,7 +2488,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.openNextImg()
 
-    def importDirImages(self, dirpath, pattern=None, load=True):
+    def importDirImages(self, dirpath, load=True):
         self.actions.openNextImg.setEnabled(True)
         self.actions.openPrevImg.setEnabled(True)
 
@@ -2398,38 +2499,30 @@ class MainWindow(QtWidgets.QMainWindow):
         self.filename = None
         self.fileListWidget.clear()
 
-        filenames = self.scanAllImages(dirpath)
-        if pattern:
-            try:
-                filenames = [f for f in filenames if re.search(pattern, f)]
-            except re.error:
-                pass
-        for filename in filenames:
-            label_file = f"{osp.splitext(filename)[0]}.json"
-            if self.output_dir:
-                label_file_without_path = osp.basename(label_file)
-                label_file = osp.join(self.output_dir, label_file_without_path)
-            item = QtWidgets.QListWidgetItem(filename)
-            item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            if QtCore.QFile.exists(label_file) and LabelFile.is_label_file(label_file):
-                item.setCheckState(Qt.Checked)
-            else:
-                item.setCheckState(Qt.Unchecked)
-            self.fileListWidget.addItem(item)
-        self.openNextImg(load=load)
+        # files are listed in batches as they are found, and the first batch
+        # opens the first file
+        self._image_scan_load = load
+        self._image_scanner.start(dirpath)
+
+    def _on_image_batch_found(self, filenames: list[str], sort_keys: list) -> None:
+        # filtered by the file search in the list
+        self.fileListWidget.insertFiles(
+            filenames,
+            label_files=[
+                get_label_file(filename=filename, output_dir=self.output_dir)
+                for filename in filenames
+            ],
+            key=_natsort_key,
+            sort_keys=sort_keys,
+        )
+        if self.filename is None:
+            self.openNextImg(load=self._image_scan_load)
 
     def scanAllImages(self, folderPath):
-        extensions = [
-            f".{fmt.data().decode().lower()}"
-            for fmt in QtGui.QImageReader.supportedImageFormats()
-        ]
-
+        extensions = get_image_extensions()
         images = []
-        for root, dirs, files in os.walk(folderPath):
-            for file in files:
-                if file.lower().endswith(tuple(extensions)):
-                    relativePath = os.path.normpath(osp.join(root, file))
-                    images.append(relativePath)
+        for files in iter_image_files(folderPath, extensions=extensions):
+            images.extend(files)
         images = natsort.os_sorted(images)
         return images
 
@@ -2456,13 +2549,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def loadGroundTruth(self, filename):
         """Load ground truth annotation from JSON file."""
-        print(f'cathy debug: loadGroundTruth called')
         try:
-            # Load label file
-            label_file = LabelFile(filename)
-            self.ground_truth_file = filename
-            self.ground_truth_shapes = label_file.shapes
-            
             # Check if image is loaded
             if not self.image or self.image.isNull():
                 self.errorMessage(
@@ -2471,35 +2558,14 @@ class MainWindow(QtWidgets.QMainWindow):
                 )
                 return
             
+            # Parsing and rasterization are cached per GT file and image size
             img_shape = (self.image.height(), self.image.width())
-            combined_mask = np.zeros(img_shape, dtype=bool)
-            
-            # Combine all ground truth polygons into one mask
-            for shape_dict in self.ground_truth_shapes:
-                points = shape_dict["points"]
-                shape_type = shape_dict.get("shape_type", "polygon")
-                
-                if shape_type == "mask" and shape_dict.get("mask") is not None:
-                    # Handle mask type
-                    mask = shape_dict["mask"]
-                    (x1, y1), (x2, y2) = np.asarray(points).astype(int)
-                    
-                    # Ensure coordinates are within bounds
-                    x1 = max(0, min(x1, img_shape[1] - 1))
-                    y1 = max(0, min(y1, img_shape[0] - 1))
-                    x2 = max(0, min(x2, img_shape[1]))
-                    y2 = max(0, min(y2, img_shape[0]))
-                    
-                    if x2 > x1 and y2 > y1:
-                        mask_h, mask_w = mask.shape
-                        combined_mask[y1:min(y2, y1+mask_h), x1:min(x2, x1+mask_w)] = np.logical_or(
-                            combined_mask[y1:min(y2, y1+mask_h), x1:min(x2, x1+mask_w)],
-                            mask[:min(y2-y1, mask_h), :min(x2-x1, mask_w)]
-                        )
-                else:
-                    # Handle polygon/rectangle/circle types
-                    mask = utils.shape_to_mask(img_shape, points, shape_type)
-                    combined_mask = np.logical_or(combined_mask, mask)
+            self.ground_truth_shapes, combined_mask = load_ground_truth(
+                filename=filename,
+                img_shape=img_shape,
+                use_cache_file=self._config["ground_truth_mask_cache_file"],
+            )
+            self.ground_truth_file = filename
             
             # Set ground truth in canvas
             self.canvas.set_ground_truth_mask(combined_mask)
@@ -2636,9 +2702,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def updateIoUDisplay(self, iou_value: float):
         """Update IoU display with new value (for currently drawing shape)."""
-        
-        print(f'cathy debug: updateIoUDisplay is called, iou: {iou_value}')
-        
+
         if iou_value == 0.0:
             self.iou_value_label.setText("0.0")
             self.iou_value_label.setStyleSheet(
@@ -2650,7 +2714,6 @@ class MainWindow(QtWidgets.QMainWindow):
             # Display IoU as percentage
             iou_percent = iou_value * 100
             self.iou_value_label.setText(f"{iou_percent:.1f}%")
-            print(f'cathy debug: set label text to {iou_percent:.1f}%')
             
             # Color coding
             if iou_percent >= 80:
@@ -2709,51 +2772,10 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         
         try:
-            from labelme.utils import shape_to_mask, calculate_iou
-            
-            # Get image shape
-            img_shape = self.canvas.ground_truth_mask.shape
-            
-            # Create combined mask
-            combined_mask = np.zeros(img_shape, dtype=bool)
-            
-            for shape in self.canvas.selectedShapes:
-                # Get points from shape
-                points = [[p.x(), p.y()] for p in shape.points]
-                
-                # Handle mask type shapes
-                if shape.shape_type == 'mask' and shape.mask is not None:
-                    shape_mask = np.zeros(img_shape, dtype=bool)
-                    
-                    if len(points) >= 2:
-                        (x1, y1), (x2, y2) = points[0], points[1]
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        
-                        # Ensure coordinates are within bounds
-                        x1 = max(0, min(x1, img_shape[1] - 1))
-                        y1 = max(0, min(y1, img_shape[0] - 1))
-                        x2 = max(0, min(x2, img_shape[1]))
-                        y2 = max(0, min(y2, img_shape[0]))
-                        
-                        if x2 > x1 and y2 > y1:
-                            mask_h, mask_w = shape.mask.shape
-                            shape_mask[y1:min(y2, y1+mask_h), x1:min(x2, x1+mask_w)] = shape.mask[:min(y2-y1, mask_h), :min(x2-x1, mask_w)]
-                else:
-                    # Handle regular shapes (polygon, rectangle, circle, etc.)
-                    if len(points) < 2:
-                        continue
-                    
-                    shape_mask = shape_to_mask(
-                        img_shape=img_shape,
-                        points=points,
-                        shape_type=shape.shape_type if shape.shape_type != 'polygon' else None
-                    )
-                
-                # Combine masks using logical OR
-                combined_mask = np.logical_or(combined_mask, shape_mask)
-            
-            # Calculate IoU for combined mask
-            combined_iou = calculate_iou(self.canvas.ground_truth_mask, combined_mask)
+            # Calculate IoU for the union of the selected shapes
+            combined_iou = self.canvas.calculate_shapes_iou(
+                self.canvas.selectedShapes
+            )
             
             # ← ADD: Collect shape IDs
             shape_ids = [shape.shape_id for shape in self.canvas.selectedShapes]
@@ -2941,3 +2963,25 @@ class MainWindow(QtWidgets.QMainWindow):
         self.iou_widget.setVisible(True)
         self.iou_value_label.setText("--")
 
+
+def _get_file_search_match(
+    text: str, mode: Literal["regex", "substring"]
+) -> Callable[[str], bool] | None:
+    if not text:
+        return None
+    if mode == "regex":
+        try:
+            return re.compile(text).search  # type: ignore[return-value]
+        except re.error:
+            # e.g. while typing "(", so matched literally
+            pass
+    return lambda filename: text in filename
+
+
+def _load_image_for_embedding(
+    filename: str, label_file: str
+) -> tuple[QtGui.QImage, str] | None:
+    loaded = LoadedImage(filename=filename, label_file=label_file)
+    if loaded.image.isNull():
+        return None
+    return loaded.image, loaded.image_key
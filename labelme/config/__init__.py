@@ -44,6 +44,10 @@ def validate_config_item(key, value):
         raise ValueError(f"Unexpected value for config key 'validate_label': {value}")
     if key == "shape_color" and value not in [None, "auto", "manual"]:
         raise ValueError(f"Unexpected value for config key 'shape_color': {value}")
+    if key == "mask_format" and value not in ["png", "rle"]:
+        raise ValueError(f"Unexpected value for config key 'mask_format': {value}")
+    if key == "file_search_mode" and value not in ["regex", "substring"]:
+        raise ValueError(f"Unexpected value for config key 'file_search_mode': {value}")
     if key == "labels" and value is not None and len(value) != len(set(value)):
         raise ValueError(f"Duplicates are detected for config key 'labels': {value}")
 
@@ -1,15 +1,35 @@
+from __future__ import annotations
+
 import copy
 
 import numpy as np
 import skimage.measure
 from loguru import logger
+from numpy.typing import NDArray
 from PyQt5 import QtCore
 from PyQt5 import QtGui
 
 import labelme.utils
 
-# TODO(unknown):
-# - [opt] Store paths instead of creating new ones at each paint.
+# Shape attributes that are not part of its content
+_NON_CONTENT_ATTRIBUTES: frozenset[str] = frozenset(
+    [
+        "_mask",
+        "selected",
+        "fill",
+        "_highlightIndex",
+        "_highlightMode",
+        "_current_vertex_fill_color",
+        "_points_array",
+        "_path",
+        "_bounding_rect",
+        "_line_path",
+        "_vertex_paths",
+        "_mask_overlay",
+        "_mask_contours",
+        "_mask_contour_path",
+    ]
+)
 
 
 class Shape:
@@ -40,6 +60,20 @@ class Shape:
     scale = 1.0
 
     _current_vertex_fill_color: QtGui.QColor
+    # geometry caches, dropped whenever the points or shape type change
+    _points_array: NDArray[np.float64] | None
+    _path: QtGui.QPainterPath | None
+    _bounding_rect: QtCore.QRectF | None
+    # ((scale, closed), path) of the outline to paint
+    _line_path: tuple[tuple, QtGui.QPainterPath] | None
+    # ((scale, highlight, ...), (vertex path, negative vertex path)) to paint
+    _vertex_paths: tuple[tuple, tuple[QtGui.QPainterPath, QtGui.QPainterPath]] | None
+    # ((fill rgba, scale), overlay image) of the mask
+    _mask_overlay: tuple[tuple, QtGui.QImage] | None
+    # contours of the mask in mask coordinates
+    _mask_contours: list[NDArray[np.float64]] | None
+    # ((x, y, scale), contour path) of the mask
+    _mask_contour_path: tuple[tuple, QtGui.QPainterPath] | None
 
     def __init__(
         self,
@@ -93,6 +127,92 @@ class Shape:
         self.point_labels = point_labels
         self.mask = mask
 
+    @property
+    def points(self):
+        return self._points
+
+    @points.setter
+    def points(self, value):
+        self._points = value
+        self._invalidate_geometry()
+
+    def _invalidate_geometry(self) -> None:
+        self._points_array = None
+        self._path = None
+        self._bounding_rect = None
+        self._line_path = None
+        self._vertex_paths = None
+
+    def _get_points_array(self) -> NDArray[np.float64]:
+        # (N, 2) array of the points, cached until the points change
+        if self._points_array is None:
+            self._points_array = np.array(
+                [[p.x(), p.y()] for p in self._points], dtype=np.float64
+            ).reshape(-1, 2)
+        return self._points_array
+
+    @property
+    def mask(self):
+        return self._mask
+
+    @mask.setter
+    def mask(self, value):
+        self._mask = value
+        self._mask_overlay = None
+        self._mask_contours = None
+        self._mask_contour_path = None
+
+    def __getstate__(self):
+        # Qt render caches are not copyable and are rebuilt on demand
+        state = self.__dict__.copy()
+        for key in [
+            "_path",
+            "_bounding_rect",
+            "_line_path",
+            "_vertex_paths",
+            "_mask_overlay",
+            "_mask_contour_path",
+        ]:
+            state[key] = None
+        return state
+
+    def _get_mask_overlay(self, fill_color: tuple[int, ...]) -> QtGui.QImage:
+        key = (fill_color, self.scale)
+        if self._mask_overlay is None or self._mask_overlay[0] != key:
+            height, width = self.mask.shape
+            image_to_draw = np.zeros((height, width, 4), dtype=np.uint8)
+            image_to_draw[self.mask] = fill_color
+            qimage = QtGui.QImage(
+                image_to_draw.data,
+                width,
+                height,
+                width * 4,
+                QtGui.QImage.Format_RGBA8888,
+            ).copy()  # detach from the numpy buffer
+            qimage = qimage.scaled(
+                qimage.size() * self.scale,
+                QtCore.Qt.IgnoreAspectRatio,
+                QtCore.Qt.SmoothTransformation,
+            )
+            self._mask_overlay = (key, qimage)
+        return self._mask_overlay[1]
+
+    def _get_mask_contour_path(self) -> QtGui.QPainterPath:
+        key = (self.points[0].x(), self.points[0].y(), self.scale)
+        if self._mask_contour_path is None or self._mask_contour_path[0] != key:
+            if self._mask_contours is None:
+                self._mask_contours = skimage.measure.find_contours(
+                    np.pad(self.mask, pad_width=1)
+                )
+            line_path = QtGui.QPainterPath()
+            for contour in self._mask_contours:
+                contour = (contour + [key[1], key[0]]) * self.scale
+                line_path.moveTo(QtCore.QPointF(contour[0, 1], contour[0, 0]))
+                for y, x in contour[1:]:
+                    line_path.lineTo(QtCore.QPointF(x, y))
+            self._mask_contour_path = (key, line_path)
+        return self._mask_contour_path[1]
+
     def restoreShapeRaw(self):
         if self._shape_raw is None:
             return
@@ -119,6 +239,7 @@ class Shape:
         ]:
             raise ValueError(f"Unexpected shape_type: {value}")
         self._shape_type = value
+        self._invalidate_geometry()
 
     def close(self):
         self._closed = True
@@ -129,6 +250,7 @@ class Shape:
         else:
             self.points.append(point)
             self.point_labels.append(label)
+            self._invalidate_geometry()
 
     def canAddPoint(self):
         return self.shape_type in ["polygon", "linestrip"]
@@ -137,12 +259,14 @@ class Shape:
         if self.points:
             if self.point_labels:
                 self.point_labels.pop()
+            self._invalidate_geometry()
             return self.points.pop()
         return None
 
     def insertPoint(self, i, point, label=1):
         self.points.insert(i, point)
         self.point_labels.insert(i, label)
+        self._invalidate_geometry()
 
     def canRemovePoint(self) -> bool:
         if not self.canAddPoint():
@@ -167,6 +291,7 @@ class Shape:
 
         self.points.pop(i)
         self.point_labels.pop(i)
+        self._invalidate_geometry()
 
     def isClosed(self):
         return self._closed
@@ -185,86 +310,24 @@ class Shape:
         painter.setPen(pen)
 
         if self.mask is not None:
-            image_to_draw = np.zeros(self.mask.shape + (4,), dtype=np.uint8)
             fill_color = (
                 self.select_fill_color.getRgb()
                 if self.selected
                 else self.fill_color.getRgb()
             )
-            image_to_draw[self.mask] = fill_color
-            qimage = QtGui.QImage.fromData(labelme.utils.img_arr_to_data(image_to_draw))
-            qimage = qimage.scaled(
-                qimage.size() * self.scale,
-                QtCore.Qt.IgnoreAspectRatio,
-                QtCore.Qt.SmoothTransformation,
+            painter.drawImage(
+                self._scale_point(point=self.points[0]),
+                self._get_mask_overlay(fill_color=fill_color),
             )
-
-            painter.drawImage(self._scale_point(point=self.points[0]), qimage)
-
-            line_path = QtGui.QPainterPath()
-            contours = skimage.measure.find_contours(np.pad(self.mask, pad_width=1))
-            for contour in contours:
-                contour += [self.points[0].y(), self.points[0].x()]
-                line_path.moveTo(
-                    self._scale_point(QtCore.QPointF(contour[0, 1], contour[0, 0]))
-                )
-                for point in contour[1:]:
-                    line_path.lineTo(
-                        self._scale_point(QtCore.QPointF(point[1], point[0]))
-                    )
-            painter.drawPath(line_path)
+            painter.drawPath(self._get_mask_contour_path())
 
         if self.points:
-            line_path = QtGui.QPainterPath()
-            vrtx_path = QtGui.QPainterPath()
-            negative_vrtx_path = QtGui.QPainterPath()
-
-            if self.shape_type in ["rectangle", "mask"]:
-                assert len(self.points) in [1, 2]
-                if len(self.points) == 2:
-                    rectangle = QtCore.QRectF(
-                        self._scale_point(self.points[0]),
-                        self._scale_point(self.points[1]),
-                    )
-                    line_path.addRect(rectangle)
-                if self.shape_type == "rectangle":
-                    for i in range(len(self.points)):
-                        self.drawVertex(vrtx_path, i)
-            elif self.shape_type == "circle":
-                assert len(self.points) in [1, 2]
-                if len(self.points) == 2:
-                    raidus = labelme.utils.distance(
-                        self._scale_point(self.points[0] - self.points[1])
-                    )
-                    line_path.addEllipse(
-                        self._scale_point(self.points[0]), raidus, raidus
-                    )
-                for i in range(len(self.points)):
-                    self.drawVertex(vrtx_path, i)
-            elif self.shape_type == "linestrip":
-                line_path.moveTo(self._scale_point(self.points[0]))
-                for i, p in enumerate(self.points):
-                    line_path.lineTo(self._scale_point(p))
-                    self.drawVertex(vrtx_path, i)
-            elif self.shape_type == "points":
-                assert len(self.points) == len(self.point_labels)
-                for i, point_label in enumerate(self.point_labels):
-                    if point_label == 1:
-                        self.drawVertex(vrtx_path, i)
-                    else:
-                        self.drawVertex(negative_vrtx_path, i)
+            line_path = self._get_line_path()
+            vrtx_path, negative_vrtx_path = self._get_vertex_paths()
+            if self._highlightIndex is not None:
+                self._current_vertex_fill_color = self.hvertex_fill_color
             else:
-                line_path.moveTo(self._scale_point(self.points[0]))
-                # Uncommenting the following line will draw 2 paths
-                # for the 1st vertex, and make it non-filled, which
-                # may be desirable.
-                # self.drawVertex(vrtx_path, 0)
-
-                for i, p in enumerate(self.points):
-                    line_path.lineTo(self._scale_point(p))
-                    self.drawVertex(vrtx_path, i)
-                if self.isClosed():
-                    line_path.lineTo(self._scale_point(self.points[0]))
+                self._current_vertex_fill_color = self.vertex_fill_color
 
             painter.drawPath(line_path)
             if vrtx_path.length() > 0:
@@ -284,6 +347,71 @@ class Shape:
             painter.drawPath(negative_vrtx_path)
             painter.fillPath(negative_vrtx_path, QtGui.QColor(255, 0, 0, 255))
 
+    def _get_line_path(self) -> QtGui.QPainterPath:
+        key = (self.scale, self._closed)
+        if self._line_path is not None and self._line_path[0] == key:
+            return self._line_path[1]
+
+        line_path = QtGui.QPainterPath()
+        if self.shape_type in ["rectangle", "mask"]:
+            assert len(self.points) in [1, 2]
+            if len(self.points) == 2:
+                rectangle = QtCore.QRectF(
+                    self._scale_point(self.points[0]),
+                    self._scale_point(self.points[1]),
+                )
+                line_path.addRect(rectangle)
+        elif self.shape_type == "circle":
+            assert len(self.points) in [1, 2]
+            if len(self.points) == 2:
+                raidus = labelme.utils.distance(
+                    self._scale_point(self.points[0] - self.points[1])
+                )
+                line_path.addEllipse(self._scale_point(self.points[0]), raidus, raidus)
+        elif self.shape_type == "points":
+            pass
+        else:
+            line_path.moveTo(self._scale_point(self.points[0]))
+            for p in self.points:
+                line_path.lineTo(self._scale_point(p))
+            if self.shape_type != "linestrip" and self.isClosed():
+                line_path.lineTo(self._scale_point(self.points[0]))
+
+        self._line_path = (key, line_path)
+        return line_path
+
+    def _get_vertex_paths(self) -> tuple[QtGui.QPainterPath, QtGui.QPainterPath]:
+        key = (
+            self.scale,
+            self.point_size,
+            self.point_type,
+            self._highlightIndex,
+            self._highlightMode,
+            tuple(self.point_labels) if self.shape_type == "points" else None,
+        )
+        if self._vertex_paths is not None and self._vertex_paths[0] == key:
+            return self._vertex_paths[1]
+
+        vrtx_path = QtGui.QPainterPath()
+        negative_vrtx_path = QtGui.QPainterPath()
+        if self.shape_type == "points":
+            assert len(self.points) == len(self.point_labels)
+            for i, point_label in enumerate(self.point_labels):
+                if point_label == 1:
+                    self.drawVertex(vrtx_path, i)
+                else:
+                    self.drawVertex(negative_vrtx_path, i)
+        elif self.shape_type != "mask":
+            # Uncommenting the following line will draw 2 paths
+            # for the 1st vertex, and make it non-filled, which
+            # may be desirable.
+            # self.drawVertex(vrtx_path, 0)
+            for i in range(len(self.points)):
+                self.drawVertex(vrtx_path, i)
+
+        self._vertex_paths = (key, (vrtx_path, negative_vrtx_path))
+        return vrtx_path, negative_vrtx_path
+
     def drawVertex(self, path, i):
         d = self.point_size
         shape = self.point_type
@@ -303,32 +431,46 @@ class Shape:
             assert False, "unsupported vertex shape"
 
     def nearestVertex(self, point, epsilon):
-        min_distance = float("inf")
-        min_i = None
-        point = QtCore.QPointF(point.x() * self.scale, point.y() * self.scale)
-        for i, p in enumerate(self.points):
-            p = QtCore.QPointF(p.x() * self.scale, p.y() * self.scale)
-            dist = labelme.utils.distance(p - point)
-            if dist <= epsilon and dist < min_distance:
-                min_distance = dist
-                min_i = i
-        return min_i
+        if not self.points:
+            return None
+        points = self._get_points_array() * self.scale
+        point = np.array([point.x(), point.y()]) * self.scale
+        distances = np.linalg.norm(points - point, axis=1)
+        i = int(np.argmin(distances))
+        if distances[i] <= epsilon:
+            return i
+        return None
 
     def nearestEdge(self, point, epsilon):
-        min_distance = float("inf")
-        post_i = None
-        point = QtCore.QPointF(point.x() * self.scale, point.y() * self.scale)
-        for i in range(len(self.points)):
-            start = self.points[i - 1]
-            end = self.points[i]
-            start = QtCore.QPointF(start.x() * self.scale, start.y() * self.scale)
-            end = QtCore.QPointF(end.x() * self.scale, end.y() * self.scale)
-            line = [start, end]
-            dist = labelme.utils.distancetoline(point, line)
-            if dist <= epsilon and dist < min_distance:
-                min_distance = dist
-                post_i = i
-        return post_i
+        if not self.points:
+            return None
+        # edge i goes from points[i - 1] to points[i]
+        ends = self._get_points_array() * self.scale
+        starts = np.roll(ends, 1, axis=0)
+        point = np.array([point.x(), point.y()]) * self.scale
+
+        edges = ends - starts
+        to_start = point - starts
+        to_end = point - ends
+        lengths = np.linalg.norm(edges, axis=1)
+        distances_to_start = np.linalg.norm(to_start, axis=1)
+        cross = edges[:, 0] * to_start[:, 1] - edges[:, 1] * to_start[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distances = np.abs(cross) / lengths
+        # same cases as labelme.utils.distancetoline
+        distances = np.where(lengths == 0, distances_to_start, distances)
+        distances = np.where(
+            np.einsum("ij,ij->i", to_end, -edges) < 0,
+            np.linalg.norm(to_end, axis=1),
+            distances,
+        )
+        distances = np.where(
+            np.einsum("ij,ij->i", to_start, edges) < 0, distances_to_start, distances
+        )
+        i = int(np.argmin(distances))
+        if distances[i] <= epsilon:
+            return i
+        return None
 
     def containsPoint(self, point) -> bool:
         if self.shape_type in ["line", "linestrip", "points"]:
@@ -348,6 +490,9 @@ class Shape:
         return self.makePath().contains(point)
 
     def makePath(self):
+        # cached until the geometry changes; do not modify the returned path
+        if self._path is not None:
+            return self._path
         if self.shape_type in ["rectangle", "mask"]:
             path = QtGui.QPainterPath()
             if len(self.points) == 2:
@@ -361,16 +506,20 @@ class Shape:
             path = QtGui.QPainterPath(self.points[0])
             for p in self.points[1:]:
                 path.lineTo(p)
+        self._path = path
         return path
 
     def boundingRect(self):
-        return self.makePath().boundingRect()
+        if self._bounding_rect is None:
+            self._bounding_rect = self.makePath().boundingRect()
+        return QtCore.QRectF(self._bounding_rect)
 
     def moveBy(self, offset):
         self.points = [p + offset for p in self.points]
 
     def moveVertexBy(self, i, offset):
         self.points[i] = self.points[i] + offset
+        self._invalidate_geometry()
 
     def highlightVertex(self, i, action):
         """Highlight a vertex appropriately based on the current action
@@ -388,7 +537,25 @@ class Shape:
         self._highlightIndex = None
 
     def copy(self):
-        return copy.deepcopy(self)
+        # masks are replaced rather than edited in place, so they are shared
+        memo = {} if self.mask is None else {id(self.mask): self.mask}
+        return copy.deepcopy(self, memo)
+
+    def hasSameContent(self, other: Shape) -> bool:
+        """Whether other is an unchanged copy of this shape.
+
+        Caches and display state such as selection and highlight are ignored.
+        """
+        if self.mask is not other.mask:
+            return False
+        if self.__dict__.keys() != other.__dict__.keys():
+            return False
+        for key, value in self.__dict__.items():
+            if key in _NON_CONTENT_ATTRIBUTES:
+                continue
+            if value != other.__dict__[key]:
+                return False
+        return True
 
     def __len__(self):
         return len(self.points)
@@ -398,3 +565,4 @@ class Shape:
 
     def __setitem__(self, key, value):
         self.points[key] = value
+        self._invalidate_geometry()
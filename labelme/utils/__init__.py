@@ -16,9 +16,15 @@ from .qt import labelValidator
 from .qt import newAction
 from .qt import newButton
 from .qt import newIcon
+from .rle import mask_to_rle
+from .rle import rle_to_mask
 from .shape import labelme_shapes_to_label
 from .shape import masks_to_bboxes
 from .shape import polygons_to_mask
+from .shape import shape_to_cropped_mask
 from .shape import shape_to_mask
 from .shape import shapes_to_label
-from .iou_calculator import calculate_iou
\ No newline at end of file
+from .iou_calculator import GroundTruthMask
+from .iou_calculator import IncrementalPolygonIoU
+from .iou_calculator import calculate_iou
+from .spatial_index import GridIndex
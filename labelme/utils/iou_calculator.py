@@ -1,25 +1,224 @@
+import math
+from typing import Optional
+
 import numpy as np
 import numpy.typing as npt
 
+from .shape import shape_to_mask
+
 
 def calculate_iou(mask1: npt.NDArray[np.bool_], mask2: npt.NDArray[np.bool_]) -> float:
     """
     Calculate Intersection over Union (IoU) between two binary masks.
-    
+
     Args:
         mask1: First binary mask
         mask2: Second binary mask
-        
+
     Returns:
         IoU score between 0 and 1
     """
     if mask1.shape != mask2.shape:
         raise ValueError(f"Mask shapes must match: {mask1.shape} vs {mask2.shape}")
-    
-    intersection = np.logical_and(mask1, mask2).sum()
-    union = np.logical_or(mask1, mask2).sum()
-    
+
+    intersection = np.count_nonzero(mask1 & mask2)
+    union = np.count_nonzero(mask1) + np.count_nonzero(mask2) - intersection
+
     if union == 0:
         return 0.0
-    
+
     return float(intersection / union)
+
+
+class GroundTruthMask:
+    """
+    Ground truth mask with its pixel count and bounding box precomputed.
+
+    IoU against a shape is computed from a mask cropped to the shape's
+    bounding box: the intersection only looks at the overlap with the
+    ground truth's bounding box, and the union comes from the known totals.
+
+    Args:
+        mask: Ground truth binary mask of shape (H, W)
+    """
+
+    def __init__(self, mask: npt.NDArray[np.bool_]):
+        self.mask = mask
+        self.area = int(np.count_nonzero(mask))
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        # (y1, x1, y2, x2) of the foreground, or None if the mask is empty
+        self.bbox: Optional[tuple[int, int, int, int]] = None
+        if rows.size:
+            self.bbox = (
+                int(rows[0]),
+                int(cols[0]),
+                int(rows[-1]) + 1,
+                int(cols[-1]) + 1,
+            )
+
+    def calculate_iou(
+        self, mask: npt.NDArray[np.bool_], offset: tuple[int, int] = (0, 0)
+    ) -> float:
+        """
+        Calculate IoU between a cropped binary mask and the ground truth.
+
+        Args:
+            mask: Binary mask of a region of the image
+            offset: (y1, x1) position of the region in the image
+
+        Returns:
+            IoU score between 0 and 1
+        """
+        height, width = self.mask.shape[:2]
+        y1, x1 = offset
+        y2, x2 = y1 + mask.shape[0], x1 + mask.shape[1]
+        # only the part inside the image counts
+        y1_in, y2_in = (min(max(y, 0), height) for y in (y1, y2))
+        x1_in, x2_in = (min(max(x, 0), width) for x in (x1, x2))
+        mask = mask[y1_in - y1 : y2_in - y1, x1_in - x1 : x2_in - x1]
+
+        area = int(np.count_nonzero(mask))
+        intersection = 0
+        if self.bbox is not None:
+            gt_y1, gt_x1, gt_y2, gt_x2 = self.bbox
+            oy1, ox1 = max(y1_in, gt_y1), max(x1_in, gt_x1)
+            oy2, ox2 = min(y2_in, gt_y2), min(x2_in, gt_x2)
+            if oy2 > oy1 and ox2 > ox1:
+                intersection = int(
+                    np.count_nonzero(
+                        mask[oy1 - y1_in : oy2 - y1_in, ox1 - x1_in : ox2 - x1_in]
+                        & self.mask[oy1:oy2, ox1:ox2]
+                    )
+                )
+
+        union = area + self.area - intersection
+        if union == 0:
+            return 0.0
+        return float(intersection / union)
+
+
+class IncrementalPolygonIoU:
+    """
+    Live IoU between a polygon being drawn and a ground truth mask.
+
+    The mask of the committed vertices is kept together with its area and
+    its intersection with the ground truth. Moving the cursor only changes
+    the triangle (last vertex, cursor, first vertex), so each update
+    rasterizes the preview polygon inside that triangle's bounding box and
+    corrects the cached counts there. When the cursor position is committed
+    as a new vertex, that window is written back into the cached mask.
+
+    Rasterizing in a window may differ from the full polygon by a few pixels
+    along its outline, so the cached mask is rebuilt from the full polygon
+    every `resync_interval` committed vertices to keep errors from piling up.
+
+    Args:
+        gt_mask: Ground truth binary mask of shape (H, W)
+        resync_interval: Number of vertices committed incrementally before
+            the cached mask is rebuilt
+    """
+
+    def __init__(self, gt_mask: npt.NDArray[np.bool_], resync_interval: int = 8):
+        self._gt_mask = gt_mask
+        self._resync_interval = resync_interval
+        self._num_incremental_updates = 0
+        self._gt_area = int(np.count_nonzero(gt_mask))
+        self._points: list[tuple[float, float]] = []
+        self._mask: npt.NDArray[np.bool_] = np.zeros(gt_mask.shape[:2], dtype=bool)
+        self._area = 0
+        self._intersection = 0
+        # (cursor, (y1, x1, y2, x2), window mask) of the latest preview
+        self._preview: Optional[
+            tuple[tuple[float, float], tuple[int, int, int, int], npt.NDArray[np.bool_]]
+        ] = None
+
+    def compute(self, points: list[list[float]]) -> float:
+        """
+        Calculate IoU of the polygon preview against the ground truth.
+
+        Args:
+            points: Committed vertices followed by the cursor position
+
+        Returns:
+            IoU score between 0 and 1
+        """
+        xy = [(float(x), float(y)) for x, y in points]
+        if not xy:
+            return 0.0
+
+        self._sync(committed=xy[:-1])
+        if len(xy) < 3:
+            self._preview = None
+            return 0.0
+
+        cursor = xy[-1]
+        y1, x1, y2, x2 = window = self._get_window([xy[0], xy[-2], cursor])
+        if y2 <= y1 or x2 <= x1:
+            self._preview = None
+            return self._iou(area=self._area, intersection=self._intersection)
+
+        new = shape_to_mask(
+            img_shape=(y2 - y1, x2 - x1),
+            points=[[x - x1, y - y1] for x, y in xy],
+        )
+        old = self._mask[y1:y2, x1:x2]
+        gt = self._gt_mask[y1:y2, x1:x2]
+        area = self._area - np.count_nonzero(old) + np.count_nonzero(new)
+        intersection = (
+            self._intersection - np.count_nonzero(old & gt) + np.count_nonzero(new & gt)
+        )
+        self._preview = (cursor, window, new)
+        return self._iou(area=area, intersection=intersection)
+
+    def _sync(self, committed: list[tuple[float, float]]) -> None:
+        if committed == self._points:
+            return
+
+        if (
+            self._num_incremental_updates < self._resync_interval
+            and self._preview is not None
+            and committed[:-1] == self._points
+            and committed[-1] == self._preview[0]
+        ):
+            # the previewed cursor position has just been committed
+            _, (y1, x1, y2, x2), new = self._preview
+            old = self._mask[y1:y2, x1:x2]
+            gt = self._gt_mask[y1:y2, x1:x2]
+            self._area += int(np.count_nonzero(new) - np.count_nonzero(old))
+            self._intersection += int(
+                np.count_nonzero(new & gt) - np.count_nonzero(old & gt)
+            )
+            self._mask[y1:y2, x1:x2] = new
+            self._num_incremental_updates += 1
+        else:
+            if len(committed) >= 3:
+                self._mask = shape_to_mask(
+                    img_shape=self._mask.shape, points=[list(p) for p in committed]
+                )
+            else:
+                self._mask[...] = False
+            self._area = int(np.count_nonzero(self._mask))
+            self._intersection = int(np.count_nonzero(self._mask & self._gt_mask))
+            self._num_incremental_updates = 0
+        self._points = committed
+        self._preview = None
+
+    def _get_window(
+        self, points: list[tuple[float, float]]
+    ) -> tuple[int, int, int, int]:
+        # one pixel margin for the polygon outline
+        height, width = self._mask.shape
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        x1 = max(0, math.floor(min(xs)) - 1)
+        y1 = max(0, math.floor(min(ys)) - 1)
+        x2 = min(width, math.ceil(max(xs)) + 2)
+        y2 = min(height, math.ceil(max(ys)) + 2)
+        return y1, x1, y2, x2
+
+    def _iou(self, area: int, intersection: int) -> float:
+        union = area + self._gt_area - intersection
+        if union == 0:
+            return 0.0
+        return float(intersection / union)
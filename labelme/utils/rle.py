@@ -0,0 +1,87 @@
+import numpy as np
+import numpy.typing as npt
+
+# Run-length encoding of binary masks in the format of COCO (pycocotools):
+# run lengths of alternating 0s and 1s in column-major order, starting with
+# 0s, and compressed into a string with a LEB128-like variable-length code.
+
+
+def mask_to_rle(mask: npt.NDArray[np.bool_]) -> dict:
+    """
+    Encode a binary mask as COCO compressed RLE.
+
+    Args:
+        mask: Binary mask of shape (H, W)
+
+    Returns:
+        {"size": [H, W], "counts": str}
+    """
+    height, width = mask.shape
+    pixels = np.asarray(mask, dtype=bool).ravel(order="F")
+    # indices where the value changes, with the ends as boundaries
+    changes = np.flatnonzero(pixels[1:] != pixels[:-1]) + 1
+    boundaries = np.concatenate([[0], changes, [pixels.size]])
+    counts = np.diff(boundaries).tolist()
+    if pixels.size and pixels[0]:
+        counts = [0] + counts
+    return {"size": [height, width], "counts": _counts_to_string(counts)}
+
+
+def rle_to_mask(rle: dict) -> npt.NDArray[np.bool_]:
+    """
+    Decode COCO RLE, compressed or as a list of counts, to a binary mask.
+
+    Args:
+        rle: {"size": [H, W], "counts": str or list[int]}
+
+    Returns:
+        Binary mask of shape (H, W)
+    """
+    height, width = rle["size"]
+    counts = rle["counts"]
+    if isinstance(counts, str):
+        counts = _string_to_counts(counts)
+    values = np.arange(len(counts)) % 2 == 1
+    pixels = np.repeat(values, counts)
+    if pixels.size != height * width:
+        raise ValueError(
+            f"RLE counts sum to {pixels.size}, but size is {height}x{width}"
+        )
+    return pixels.reshape((height, width), order="F")
+
+
+def _counts_to_string(counts: list[int]) -> str:
+    chars = []
+    for i, count in enumerate(counts):
+        x = count - counts[i - 2] if i > 2 else count
+        while True:
+            c = x & 0x1F
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+            if not more:
+                break
+    return "".join(chars)
+
+
+def _string_to_counts(string: str) -> list[int]:
+    counts: list[int] = []
+    p = 0
+    while p < len(string):
+        x = 0
+        k = 0
+        while True:
+            c = ord(string[p]) - 48
+            x |= (c & 0x1F) << (5 * k)
+            p += 1
+            k += 1
+            if not c & 0x20:
+                if c & 0x10:
+                    x |= -1 << (5 * k)
+                break
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
@@ -55,6 +55,60 @@ def shape_to_mask(
     return np.array(mask, dtype=bool)
 
 
+def shape_to_cropped_mask(
+    img_shape: tuple[int, ...],
+    points: list[list[float]],
+    shape_type: Optional[str] = None,
+    line_width: int = 10,
+    point_size: int = 5,
+) -> tuple[npt.NDArray[np.bool_], tuple[int, int]]:
+    """Rasterize a shape only inside its own bounding box.
+
+    Returns the mask of the part of the bounding box inside the image and its
+    (y1, x1) offset in the image, so memory and time scale with the shape's
+    area rather than with img_shape.
+    """
+    xy = np.asarray(points, dtype=float).reshape(-1, 2)
+    if shape_type == "circle":
+        assert len(xy) == 2, "Shape of shape_type=circle must have 2 points"
+        r = np.linalg.norm(xy[0] - xy[1])
+        (x_min, y_min), (x_max, y_max) = xy[0] - r, xy[0] + r
+    else:
+        (x_min, y_min), (x_max, y_max) = xy.min(axis=0), xy.max(axis=0)
+        if shape_type == "rectangle":
+            xy = np.array([[x_min, y_min], [x_max, y_max]])
+        if shape_type in ["line", "linestrip"]:
+            margin = line_width / 2
+        elif shape_type == "point":
+            margin = point_size
+        else:
+            margin = 0
+        x_min, y_min, x_max, y_max = (
+            x_min - margin,
+            y_min - margin,
+            x_max + margin,
+            y_max + margin,
+        )
+
+    # one pixel margin for the outline
+    x1 = math.floor(x_min) - 1
+    y1 = math.floor(y_min) - 1
+    x2 = math.ceil(x_max) + 2
+    y2 = math.ceil(y_max) + 2
+    mask = shape_to_mask(
+        (y2 - y1, x2 - x1),
+        points=(xy - [x1, y1]).tolist(),
+        shape_type=shape_type,
+        line_width=line_width,
+        point_size=point_size,
+    )
+
+    height, width = img_shape[:2]
+    y1_in, y2_in = (min(max(y, 0), height) for y in (y1, y2))
+    x1_in, x2_in = (min(max(x, 0), width) for x in (x1, x2))
+    return mask[y1_in - y1 : y2_in - y1, x1_in - x1 : x2_in - x1], (y1_in, x1_in)
+
+
 def shapes_to_label(img_shape, shapes, label_name_to_value):
     cls = np.zeros(img_shape[:2], dtype=np.int32)
     ins = np.zeros_like(cls)
@@ -0,0 +1,90 @@
+import collections
+import math
+from typing import Any
+
+
+class GridIndex:
+    """
+    Uniform grid over axis-aligned bounding boxes.
+
+    Each item is registered in every cell its box overlaps, so a point query
+    only looks at the items of the few cells around the point. Items whose
+    box spans too many cells are kept in a separate list that is always
+    checked.
+
+    Args:
+        cell_size: Width and height of a grid cell
+        max_cells_per_item: Items overlapping more cells are not gridded
+    """
+
+    def __init__(self, cell_size: float = 64.0, max_cells_per_item: int = 256):
+        self._cell_size = float(cell_size)
+        self._max_cells_per_item = max_cells_per_item
+        self._items: list[Any] = []
+        self._boxes: list[tuple[float, float, float, float]] = []
+        self._cells: dict[tuple[int, int], list[int]] = collections.defaultdict(list)
+        self._large: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def insert(self, item: Any, box: tuple[float, float, float, float]) -> None:
+        """
+        Add an item with its bounding box.
+
+        Args:
+            item: Object returned by queries
+            box: (x1, y1, x2, y2) of the item
+        """
+        x1, y1, x2, y2 = box
+        index = len(self._items)
+        self._items.append(item)
+        self._boxes.append((min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+
+        cx1, cy1, cx2, cy2 = self._get_cell_range(*self._boxes[index], margin=0.0)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self._max_cells_per_item:
+            self._large.append(index)
+            return
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                self._cells[cx, cy].append(index)
+
+    def query(self, x: float, y: float, margin: float = 0.0) -> list[Any]:
+        """
+        Find items whose bounding box is within margin of a point.
+
+        Args:
+            x: X coordinate of the point
+            y: Y coordinate of the point
+            margin: Distance by which boxes are grown
+
+        Returns:
+            Matching items in insertion order
+        """
+        cx1, cy1, cx2, cy2 = self._get_cell_range(x, y, x, y, margin=margin)
+        candidates: set[int]
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._items):
+            # cheaper to check every box than to visit the cells
+            candidates = set(range(len(self._items)))
+        else:
+            candidates = set(self._large)
+            for cy in range(cy1, cy2 + 1):
+                for cx in range(cx1, cx2 + 1):
+                    candidates.update(self._cells.get((cx, cy), ()))
+
+        indices = []
+        for index in candidates:
+            x1, y1, x2, y2 = self._boxes[index]
+            if x1 - margin <= x <= x2 + margin and y1 - margin <= y <= y2 + margin:
+                indices.append(index)
+        return [self._items[index] for index in sorted(indices)]
+
+    def _get_cell_range(
+        self, x1: float, y1: float, x2: float, y2: float, margin: float
+    ) -> tuple[int, int, int, int]:
+        return (
+            math.floor((x1 - margin) / self._cell_size),
+            math.floor((y1 - margin) / self._cell_size),
+            math.floor((x2 + margin) / self._cell_size),
+            math.floor((y2 + margin) / self._cell_size),
+        )
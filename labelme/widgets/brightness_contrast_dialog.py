@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import PIL.Image
 import PIL.ImageEnhance
 from PyQt5 import QtWidgets
@@ -58,6 +60,14 @@ class BrightnessContrastDialog(QtWidgets.QDialog):
         self.img = img
         self.callback = callback
 
+    @classmethod
+    def isDefaultValue(cls, brightness: int | None, contrast: int | None) -> bool:
+        """Return whether the values leave the image unchanged."""
+        return brightness in [None, cls._base_value] and contrast in [
+            None,
+            cls._base_value,
+        ]
+
     def onNewValue(self, _):
         brightness = self.slider_brightness.value() / self._base_value
         contrast = self.slider_contrast.value() / self._base_value
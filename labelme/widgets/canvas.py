@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import functools
+import hashlib
+import threading
+from typing import Callable
 from typing import Literal
 
 import imgviz
@@ -16,8 +19,10 @@ from PyQt5.QtCore import Qt
 
 import labelme.utils
 from labelme._automation import polygon_from_mask
+from labelme._automation.embedding_cache import EmbeddingCache
 from labelme.shape import Shape
 
+from .coalescing_worker import CoalescingWorker
 from .download import download_ai_model
 
 # TODO(unknown):
@@ -90,6 +95,8 @@ class Canvas(QtWidgets.QWidget):
         self.mode = self.EDIT
         self.shapes = []
         self.shapesBackups = []
+        # id(shape) -> (shape, its latest snapshot in shapesBackups)
+        self._shape_snapshots: dict[int, tuple[Shape, Shape]] = {}
         self.current = None
         self.selectedShapes = []  # save the selected shapes here
         self.selectedShapesCopy = []
@@ -104,6 +111,12 @@ class Canvas(QtWidgets.QWidget):
         self.offsets = QPointF(), QPointF()
         self.scale = 1.0
         self.pixmap = QtGui.QPixmap()
+        # the pixmap converted for SAM, once it is first used
+        self._image: QtGui.QImage | None = None
+        # identifies the pixmap content for the image embedding cache, or
+        # None until it is hashed from the pixels on first use
+        self._image_key: str | None = ""
+        self._embedding_cache: EmbeddingCache | None = None
         self.visible = {}
         self._hideBackround = False
         self.hideBackround = False
@@ -120,7 +133,25 @@ class Canvas(QtWidgets.QWidget):
         self._cursor = CURSOR_DEFAULT
         self.ground_truth_mask = None
         self.image_shape = None
+        self._ground_truth: labelme.utils.GroundTruthMask | None = None
+        self._live_iou: labelme.utils.IncrementalPolygonIoU | None = None
         self._last_iou = 0.0
+        # Bounding box grid for hit-testing, rebuilt lazily after edits
+        self._shape_index: labelme.utils.GridIndex | None = None
+        self._shape_index_key: tuple[int, int] | None = None
+        # Widget area of the last painted drawing preview
+        self._preview_rect = QtCore.QRect()
+        # IoU of the drawing preview is computed off the GUI thread
+        self._iou_worker = CoalescingWorker(parent=self, drop_superseded=True)
+        self._iou_worker.finished.connect(self._on_iou_calculated)
+        # SAM preview of ai_polygon/ai_mask is also computed off the GUI thread
+        self._sam_preview_worker = CoalescingWorker(parent=self)
+        self._sam_preview_worker.finished.connect(self._on_sam_preview_computed)
+        self._sam_preview: Shape | None = None
+        # Embeddings of upcoming images are computed on their own thread
+        self._embedding_prefetch_pool = QtCore.QThreadPool(self)
+        self._embedding_prefetch_pool.setMaxThreadCount(1)
+        self._embedding_prefetch_cancelled = threading.Event()
 
         # Menus:
         # 0: right-click without selection and dragging of shapes
@@ -159,6 +190,53 @@ class Canvas(QtWidgets.QWidget):
         logger.debug("Setting AI model to {!r}", model_name)
         self._ai_model_name = model_name
 
+    def set_embedding_cache(self, embedding_cache: EmbeddingCache | None) -> None:
+        self._embedding_cache = embedding_cache
+
+    def prefetch_image_embeddings(
+        self, load_images: list[Callable[[], tuple[QtGui.QImage, str] | None]]
+    ) -> None:
+        """
+        Compute image embeddings of upcoming images in the background.
+
+        Pending prefetches are cancelled first. Nothing is prefetched until
+        the AI model has been used, so that it is not loaded needlessly.
+
+        Args:
+            load_images: Functions returning an image and its key, called
+                on the prefetch thread
+        """
+        self.cancel_image_embedding_prefetch()
+        if not (
+            self._ai_model_cache and self._ai_model_cache.name == self._ai_model_name
+        ):
+            return
+        self._embedding_prefetch_cancelled = threading.Event()
+        for load_image in load_images:
+            self._embedding_prefetch_pool.start(
+                _EmbeddingPrefetchRunnable(
+                    sam=self._ai_model_cache,
+                    load_image=load_image,
+                    embedding_cache=self._embedding_cache,
+                    cancelled=self._embedding_prefetch_cancelled,
+                )
+            )
+
+    def cancel_image_embedding_prefetch(self) -> None:
+        # the running prefetch, if any, still finishes its current step
+        self._embedding_prefetch_cancelled.set()
+        self._embedding_prefetch_pool.clear()
+
+    def cancel_background_tasks(self) -> None:
+        """Cancel the background tasks and wait for those running, e.g. on close."""
+        self.cancel_image_embedding_prefetch()
+        self._iou_worker.cancel()
+        self._sam_preview_worker.cancel()
+        # before the thread pools are destroyed, which would block holding the GIL
+        self._embedding_prefetch_pool.waitForDone()
+        self._iou_worker.wait()
+        self._sam_preview_worker.wait()
+
     def _get_ai_model(self) -> osam.types.Model:
         if self._ai_model_cache and self._ai_model_cache.name == self._ai_model_name:
             return self._ai_model_cache
@@ -169,9 +247,18 @@ class Canvas(QtWidgets.QWidget):
         return self._ai_model_cache
 
     def storeShapes(self):
+        self._invalidate_shape_index()
+        # Snapshots are never modified, so unchanged shapes share the
+        # snapshot of the previous backup instead of being copied again.
         shapesBackup = []
+        snapshots = {}
         for shape in self.shapes:
-            shapesBackup.append(shape.copy())
+            _, snapshot = self._shape_snapshots.get(id(shape), (None, None))
+            if snapshot is None or not shape.hasSameContent(snapshot):
+                snapshot = shape.copy()
+            snapshots[id(shape)] = (shape, snapshot)
+            shapesBackup.append(snapshot)
+        self._shape_snapshots = snapshots
         if len(self.shapesBackups) > self.num_backups:
             self.shapesBackups = self.shapesBackups[-self.num_backups - 1 :]
         self.shapesBackups.append(shapesBackup)
@@ -196,7 +283,13 @@ class Canvas(QtWidgets.QWidget):
         # The application will eventually call Canvas.loadShapes which will
         # push this right back onto the stack.
         shapesBackup = self.shapesBackups.pop()
-        self.shapes = shapesBackup
+        # Snapshots may be shared with older backups, so edit copies of them.
+        self.shapes = [snapshot.copy() for snapshot in shapesBackup]
+        self._shape_snapshots = {
+            id(shape): (shape, snapshot)
+            for shape, snapshot in zip(self.shapes, shapesBackup)
+        }
+        self._invalidate_shape_index()
         self.selectedShapes = []
         for shape in self.shapes:
             shape.selected = False
@@ -215,6 +308,25 @@ class Canvas(QtWidgets.QWidget):
         self.restoreCursor()
         self._update_status()
 
+    def _invalidate_shape_index(self) -> None:
+        self._shape_index = None
+
+    def _get_shapes_near(self, point: QPointF, margin: float) -> list[Shape]:
+        """Shapes whose bounding box is within margin of point, in z-order."""
+        key = (id(self.shapes), len(self.shapes))
+        if self._shape_index is None or self._shape_index_key != key:
+            index = labelme.utils.GridIndex()
+            for shape in self.shapes:
+                if not shape.points:
+                    continue
+                rect = shape.boundingRect()
+                index.insert(
+                    shape, (rect.left(), rect.top(), rect.right(), rect.bottom())
+                )
+            self._shape_index = index
+            self._shape_index_key = key
+        return self._shape_index.query(point.x(), point.y(), margin=margin)
+
     def isVisible(self, shape):  # type: ignore[override]
         return self.visible.get(shape, True)
 
@@ -350,6 +462,7 @@ class Canvas(QtWidgets.QWidget):
                     self.current.point_labels[-1],
                     0 if is_shift_pressed else 1,
                 ]
+                self._request_sam_preview()
             elif self.createMode == "rectangle":
                 self.line.points = [self.current[0], pos]
                 self.line.point_labels = [1, 1]
@@ -367,8 +480,10 @@ class Canvas(QtWidgets.QWidget):
                 self.line.point_labels = [1]
                 self.line.close()
             assert len(self.line.points) == len(self.line.point_labels)
-            self.repaint()
+            self._repaint_drawing_preview()
             self.current.highlightClear()
+            # live IoU of the preview, with the cursor as its last vertex
+            self.calculate_and_emit_iou()
             self._update_status()
             return
 
@@ -376,24 +491,29 @@ class Canvas(QtWidgets.QWidget):
         if Qt.RightButton & ev.buttons():
             if self.selectedShapesCopy and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                rect = self._get_shapes_rect(self.selectedShapesCopy)
                 self.boundedMoveShapes(self.selectedShapesCopy, pos)
-                self.repaint()
+                rect |= self._get_shapes_rect(self.selectedShapesCopy)
+                self._repaint_rect(rect)
             elif self.selectedShapes:
                 self.selectedShapesCopy = [s.copy() for s in self.selectedShapes]
-                self.repaint()
+                self._repaint_rect(self._get_shapes_rect(self.selectedShapesCopy))
             self._update_status()
             return
 
         # Polygon/Vertex moving.
         if Qt.LeftButton & ev.buttons():
             if self.selectedVertex():
+                assert self.hShape is not None
+                rect = self._get_shapes_rect([self.hShape])
                 self.boundedMoveVertex(pos)
-                self.repaint()
+                self._repaint_rect(rect | self._get_shapes_rect([self.hShape]))
                 self.movingShape = True
             elif self.selectedShapes and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                rect = self._get_shapes_rect(self.selectedShapes)
                 self.boundedMoveShapes(self.selectedShapes, pos)
-                self.repaint()
+                self._repaint_rect(rect | self._get_shapes_rect(self.selectedShapes))
                 self.movingShape = True
             return
 
@@ -402,7 +522,8 @@ class Canvas(QtWidgets.QWidget):
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
         status_messages: list[str] = []
-        for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
+        nearby_shapes = self._get_shapes_near(pos, margin=self.epsilon / self.scale)
+        for shape in reversed([s for s in nearby_shapes if self.isVisible(s)]):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
             index = shape.nearestVertex(pos, self.epsilon)
@@ -455,9 +576,6 @@ class Canvas(QtWidgets.QWidget):
             self.restoreCursor()
             self.unHighlight()
         self.vertexSelected.emit(self.hVertex is not None)
-        if self.drawing() and self.current and self.ground_truth_mask is not None:
-            print(f'cathy debug: mouseMoveEvent, called calculate IoU')
-            self.calculate_and_emit_iou()
         self._update_status(extra_messages=status_messages)
 
     def addPointToEdge(self):
@@ -467,6 +585,7 @@ class Canvas(QtWidgets.QWidget):
         if shape is None or index is None or point is None:
             return
         shape.insertPoint(index, point)
+        self._invalidate_shape_index()
         shape.highlightVertex(index, shape.MOVE_VERTEX)
         self.hShape = shape
         self.hVertex = index
@@ -479,6 +598,7 @@ class Canvas(QtWidgets.QWidget):
         if shape is None or index is None:
             return
         shape.removePoint(index)
+        self._invalidate_shape_index()
         shape.highlightClear()
         self.hShape = shape
         self.prevhVertex = None
@@ -514,10 +634,12 @@ class Canvas(QtWidgets.QWidget):
                             self.line.points[1],
                             label=self.line.point_labels[1],
                         )
-                        self.line.points[0] = self.current.points[-1]
+                        self.line[0] = self.current.points[-1]
                         self.line.point_labels[0] = self.current.point_labels[-1]
                         if ev.modifiers() & Qt.ControlModifier:
                             self.finalise()
+                        else:
+                            self._request_sam_preview()
                 elif not self.outOfPixmap(pos):
                     if self.createMode in ["ai_polygon", "ai_mask"]:
                         if not download_ai_model(
@@ -526,6 +648,7 @@ class Canvas(QtWidgets.QWidget):
                             return
 
                     # Create new shape.
+                    self._clear_sam_preview()
                     self.current = Shape(
                         shape_type="points"
                         if self.createMode in ["ai_polygon", "ai_mask"]
@@ -662,7 +785,7 @@ class Canvas(QtWidgets.QWidget):
             self.hShape.highlightVertex(i=self.hVertex, action=self.hShape.MOVE_VERTEX)
         else:
             shape: Shape
-            for shape in reversed(self.shapes):
+            for shape in reversed(self._get_shapes_near(point, margin=0.0)):
                 if self.isVisible(shape) and shape.containsPoint(point):
                     self.setHiding()
                     if shape not in self.selectedShapes:
@@ -709,6 +832,7 @@ class Canvas(QtWidgets.QWidget):
         if self.outOfPixmap(pos):
             pos = self.intersectionPoint(point, pos)
         self.hShape.moveVertexBy(i=self.hVertex, offset=pos - point)
+        self._invalidate_shape_index()
 
     def boundedMoveShapes(self, shapes, pos):
         if self.outOfPixmap(pos):
@@ -731,6 +855,7 @@ class Canvas(QtWidgets.QWidget):
         if dp:
             for shape in shapes:
                 shape.moveBy(dp)
+            self._invalidate_shape_index()
             self.prevPoint = pos
             return True
         return False
@@ -761,6 +886,49 @@ class Canvas(QtWidgets.QWidget):
         self.storeShapes()
         self.update()
 
+    def _get_widget_rect(self, rect: QtCore.QRectF) -> QtCore.QRect:
+        """Widget area covering an image rect, including vertex handles."""
+        # radius of the largest (highlighted) vertex plus the pen
+        margin = int(Shape.point_size * 2 + Shape.PEN_WIDTH + 1)
+        return (
+            QtCore.QRectF(
+                (rect.topLeft() + self.offsetToCenter()) * self.scale,
+                rect.size() * self.scale,
+            )
+            .toAlignedRect()
+            .adjusted(-margin, -margin, margin, margin)
+        )
+
+    def _get_shapes_rect(self, shapes: list[Shape]) -> QtCore.QRect:
+        rect = QtCore.QRect()
+        for shape in shapes:
+            if not shape.points:
+                continue
+            rect |= self._get_widget_rect(shape.boundingRect())
+            if shape.mask is not None:
+                height, width = shape.mask.shape
+                rect |= self._get_widget_rect(
+                    QtCore.QRectF(shape.points[0], QtCore.QSizeF(width, height))
+                )
+        return rect
+
+    def _repaint_rect(self, rect: QtCore.QRect) -> None:
+        if not rect.isEmpty():
+            self.repaint(rect)
+
+    def _repaint_drawing_preview(self) -> None:
+        if self._crosshair[self._createMode] or self.createMode in [
+            "ai_polygon",
+            "ai_mask",
+        ]:
+            # the crosshair and the AI preview may span the whole canvas
+            self._preview_rect = QtCore.QRect()
+            self.repaint()
+            return
+        rect = self._get_shapes_rect([self.current, self.line])
+        self._repaint_rect(rect | self._preview_rect)
+        self._preview_rect = rect
+
     def paintEvent(self, event: QtGui.QPaintEvent) -> None:
         if not self.pixmap:
             return super().paintEvent(event)
@@ -774,7 +942,18 @@ class Canvas(QtWidgets.QWidget):
         p.scale(self.scale, self.scale)
         p.translate(self.offsetToCenter())
 
-        p.drawPixmap(0, 0, self.pixmap)
+        # only the exposed part of the image
+        exposed_rect = (
+            QtCore.QRectF(
+                QPointF(event.rect().topLeft()) / self.scale - self.offsetToCenter(),
+                QtCore.QSizeF(event.rect().size()) / self.scale,
+            )
+            .toAlignedRect()
+            .adjusted(-1, -1, 1, 1)
+            .intersected(self.pixmap.rect())
+        )
+        if not exposed_rect.isEmpty():
+            p.drawPixmap(exposed_rect, self.pixmap, exposed_rect)
 
         p.scale(1 / self.scale, 1 / self.scale)
 
@@ -803,6 +982,8 @@ class Canvas(QtWidgets.QWidget):
         for shape in self.shapes:
             if (shape.selected or not self._hideBackround) and self.isVisible(shape):
                 shape.fill = shape.selected or shape == self.hShape
+                if not event.rect().intersects(self._get_shapes_rect([shape])):
+                    continue
                 shape.paint(p)
         if self.current:
             self.current.paint(p)
@@ -820,28 +1001,25 @@ class Canvas(QtWidgets.QWidget):
             p.end()
             return
 
+        if self.createMode in ["ai_polygon", "ai_mask"]:
+            # computed in the background, see _request_sam_preview
+            if self._sam_preview is not None:
+                self._sam_preview.fill = self.fillDrawing()
+                self._sam_preview.selected = self.fillDrawing()
+                self._sam_preview.paint(p)
+            p.end()
+            return
+
         drawing_shape: Shape = self.current.copy()
-        if self.createMode == "polygon":
-            if self.fillDrawing() and len(self.current.points) >= 2:
-                assert drawing_shape.fill_color is not None
-                if drawing_shape.fill_color.getRgb()[3] == 0:
-                    logger.warning(
-                        "fill_drawing=true, but fill_color is transparent,"
-                        " so forcing to be opaque."
-                    )
-                    drawing_shape.fill_color.setAlpha(64)
-                drawing_shape.addPoint(self.line[1])
-        elif self.createMode in ["ai_polygon", "ai_mask"]:
-            drawing_shape.addPoint(
-                point=self.line.points[1],
-                label=self.line.point_labels[1],
-            )
-            _update_shape_with_sam(
-                sam=self._get_ai_model(),
-                pixmap=self.pixmap,
-                shape=drawing_shape,
-                createMode=self.createMode,
-            )
+        if self.fillDrawing() and len(self.current.points) >= 2:
+            assert drawing_shape.fill_color is not None
+            if drawing_shape.fill_color.getRgb()[3] == 0:
+                logger.warning(
+                    "fill_drawing=true, but fill_color is transparent,"
+                    " so forcing to be opaque."
+                )
+                drawing_shape.fill_color.setAlpha(64)
+            drawing_shape.addPoint(self.line[1])
         drawing_shape.fill = self.fillDrawing()
         drawing_shape.selected = self.fillDrawing()
         drawing_shape.paint(p)
@@ -864,12 +1042,53 @@ class Canvas(QtWidgets.QWidget):
         w, h = self.pixmap.width(), self.pixmap.height()
         return not (0 <= p.x() <= w - 1 and 0 <= p.y() <= h - 1)
 
+    def _request_sam_preview(self) -> None:
+        assert self.current
+        drawing_shape: Shape = self.current.copy()
+        drawing_shape.addPoint(
+            point=self.line.points[1],
+            label=self.line.point_labels[1],
+        )
+        self._sam_preview_worker.submit(
+            functools.partial(
+                _compute_sam_preview,
+                sam=self._get_ai_model(),
+                image=self._get_image(),
+                image_key=self._get_image_key(),
+                embedding_cache=self._embedding_cache,
+                shape=drawing_shape,
+                createMode=self.createMode,
+            )
+        )
+
+    def _get_image(self) -> QtGui.QImage:
+        # converting copies the whole frame, so it is not done per prompt
+        if self._image is None:
+            self._image = self.pixmap.toImage()
+        return self._image
+
+    def _get_image_key(self) -> str:
+        if self._image_key is None:
+            self._image_key = _hash_image(self._get_image())
+        return self._image_key
+
+    def _on_sam_preview_computed(self, shape: Shape) -> None:
+        self._sam_preview = shape
+        self.update()
+
+    def _clear_sam_preview(self) -> None:
+        self._sam_preview_worker.cancel()
+        self._sam_preview = None
+
     def finalise(self):
         assert self.current
         if self.createMode in ["ai_polygon", "ai_mask"]:
+            self._clear_sam_preview()
             _update_shape_with_sam(
                 sam=self._get_ai_model(),
-                pixmap=self.pixmap,
+                image=self._get_image(),
+                image_key=self._get_image_key(),
+                embedding_cache=self._embedding_cache,
                 shape=self.current,
                 createMode=self.createMode,
             )
@@ -881,6 +1100,7 @@ class Canvas(QtWidgets.QWidget):
         self.setHiding(False)
         self.newShape.emit()
         if self.ground_truth_mask is not None:
+            self._iou_worker.cancel()
             self._last_iou = 0.0
             self.iouUpdated.emit(0.0)
         self.update()
@@ -972,8 +1192,9 @@ class Canvas(QtWidgets.QWidget):
 
     def moveByKeyboard(self, offset):
         if self.selectedShapes:
+            rect = self._get_shapes_rect(self.selectedShapes)
             self.boundedMoveShapes(self.selectedShapes, self.prevPoint + offset)
-            self.repaint()
+            self._repaint_rect(rect | self._get_shapes_rect(self.selectedShapes))
             self.movingShape = True
 
     def keyPressEvent(self, ev):
@@ -982,6 +1203,7 @@ class Canvas(QtWidgets.QWidget):
         if self.drawing():
             if key == Qt.Key_Escape and self.current:
                 self.current = None
+                self._clear_sam_preview()
                 self.drawingPolygon.emit(False)
                 self.update()
             elif (
@@ -1027,6 +1249,7 @@ class Canvas(QtWidgets.QWidget):
     def undoLastLine(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self._invalidate_shape_index()
         self.current.setOpen()
         self.current.restoreShapeRaw()
         if self.createMode in ["polygon", "linestrip"]:
@@ -1048,10 +1271,20 @@ class Canvas(QtWidgets.QWidget):
             self.drawingPolygon.emit(False)
         if self.ground_truth_mask is not None:
             self.calculate_and_emit_iou()
+        if self.current and self.createMode in ["ai_polygon", "ai_mask"]:
+            self._request_sam_preview()
         self.update()
 
-    def loadPixmap(self, pixmap, clear_shapes=True):
+    def loadPixmap(self, pixmap, clear_shapes=True, image_key: str | None = None):
+        """Set the image to annotate.
+
+        image_key identifies the image content, e.g. a hash of the file. When
+        not given, it is hashed from the pixels once SAM is first used.
+        """
         self.pixmap = pixmap
+        self._image = None
+        self._image_key = image_key
+        self._clear_sam_preview()
         if clear_shapes:
             self.shapes = []
         self.update()
@@ -1086,13 +1319,19 @@ class Canvas(QtWidgets.QWidget):
     def resetState(self):
         self.restoreCursor()
         self.pixmap = QtGui.QPixmap()
+        self._image = None
         self.shapesBackups = []
+        self._shape_snapshots = {}
+        self._iou_worker.cancel()
+        self._clear_sam_preview()
         self.update()
         
     def set_ground_truth_mask(self, mask: np.ndarray) -> None:
         """Set the ground truth mask for IoU calculation."""
         self.ground_truth_mask = mask
         self.image_shape = mask.shape[:2]
+        self._ground_truth = labelme.utils.GroundTruthMask(mask)
+        self._live_iou = labelme.utils.IncrementalPolygonIoU(gt_mask=mask)
         logger.info(f"Ground truth mask set with shape: {mask.shape}")
 
     def _get_current_preview_points(self) -> list:
@@ -1113,81 +1352,40 @@ class Canvas(QtWidgets.QWidget):
 
     def calculate_and_emit_iou(self) -> None:
         """
-        Calculate IoU between current drawing and ground truth, then emit signal.
+        Request IoU between current drawing and ground truth.
+
+        The IoU is computed in the background and emitted through
+        `iouUpdated` when it changes. Requests posted while one is running
+        are coalesced, so only the latest preview is computed next.
         This should be called from mouseMoveEvent, mousePressEvent, and undoLastPoint.
         """
         if self.ground_truth_mask is None:
-            print(f'cathy debug: no groundtruth mask')
             return
         
         if not self.drawing():
-            print(f'cathy debug: not drawing mode')
             return
         
         if self.createMode not in ['polygon', 'rectangle', 'circle', 'linestrip']:
-            print(f'cathy debug: not polygon')
             return
         
-        iou = self._calculate_current_iou()
-        print(f'cathy debug: IoU calculated: {iou}')
-        
+        if not self.current:
+            return
+
+        self._iou_worker.submit(
+            functools.partial(
+                _calculate_preview_iou,
+                points=self._get_current_preview_points(),
+                create_mode=self.createMode,
+                ground_truth=self._ground_truth,
+                live_iou=self._live_iou,
+            )
+        )
+
+    def _on_iou_calculated(self, iou: float) -> None:
         # Only emit if IoU changed (avoid unnecessary updates)
         if abs(iou - self._last_iou) > 0.001:
-            print(f'cathy debug: last IoU: {self._last_iou}')
             self._last_iou = iou
-            print(f'cathy debug: last IoU: {self._last_iou}')
-
             self.iouUpdated.emit(iou)
-        else:
-            print(f'cathy debug: IoU not changed')
-
-    def _calculate_current_iou(self) -> float:
-        """
-        Calculate IoU between current drawing preview and ground truth.
-        Returns 0.0 if no valid polygon can be formed.
-        """
-        if self.ground_truth_mask is None or not self.current:
-            return 0.0
-        
-        try:
-            points = self._get_current_preview_points()
-            
-            # Need at least 3 points for polygon
-            if len(points) < 3 and self.createMode in ['polygon', 'linestrip']:
-                return 0.0
-            
-            # Need at least 2 points for rectangle/circle
-            if len(points) < 2 and self.createMode in ['rectangle', 'circle']:
-                return 0.0
-            
-            # Import here to avoid circular imports
-            from labelme.utils import shape_to_mask, calculate_iou
-            
-            # Determine shape type for mask conversion
-            shape_type = None
-            if self.createMode == 'rectangle':
-                shape_type = 'rectangle'
-                points = points[:2]  # Only use first two points for rectangle
-            elif self.createMode == 'circle':
-                shape_type = 'circle'
-                points = points[:2]  # Only use first two points for circle
-            elif self.createMode in ['polygon', 'linestrip']:
-                shape_type = None  # Will be treated as polygon
-            
-            # Create mask from current preview points
-            current_mask = shape_to_mask(
-                img_shape=self.ground_truth_mask.shape,
-                points=points,
-                shape_type=shape_type
-            )
-            
-            # Calculate IoU
-            iou = calculate_iou(self.ground_truth_mask, current_mask)
-            return iou
-            
-        except Exception as e:
-            logger.debug(f"Error calculating IoU: {e}")
-            return 0.0
 
     def calculate_shape_iou(self, shape: Shape) -> float:
         """
@@ -1200,58 +1398,135 @@ class Canvas(QtWidgets.QWidget):
         Returns:
             IoU value between 0 and 1, or 0.0 if calculation fails
         """
-        if self.ground_truth_mask is None:
+        if self._ground_truth is None:
             return 0.0
         
         try:
-            from labelme.utils import shape_to_mask, calculate_iou
-            
-            # Get points from shape
-            points = [[p.x(), p.y()] for p in shape.points]
-            
-            # Handle mask type shapes
-            if shape.shape_type == 'mask' and shape.mask is not None:
-                # For mask type, we need to place it in the correct location
-                img_shape = self.ground_truth_mask.shape
-                shape_mask = np.zeros(img_shape, dtype=bool)
-                
-                if len(points) >= 2:
-                    (x1, y1), (x2, y2) = points[0], points[1]
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                    
-                    # Ensure coordinates are within bounds
-                    x1 = max(0, min(x1, img_shape[1] - 1))
-                    y1 = max(0, min(y1, img_shape[0] - 1))
-                    x2 = max(0, min(x2, img_shape[1]))
-                    y2 = max(0, min(y2, img_shape[0]))
-                    
-                    if x2 > x1 and y2 > y1:
-                        shape_mask[y1:y2, x1:x2] = shape.mask[:y2-y1, :x2-x1]
-                
-                iou = calculate_iou(self.ground_truth_mask, shape_mask)
-                return iou
-            
-            # Handle regular shapes (polygon, rectangle, circle, etc.)
-            if len(points) < 2:
-                return 0.0
-            
-            shape_mask = shape_to_mask(
-                img_shape=self.ground_truth_mask.shape,
-                points=points,
-                shape_type=shape.shape_type if shape.shape_type != 'polygon' else None
-            )
-            
-            iou = calculate_iou(self.ground_truth_mask, shape_mask)
-            return iou
-            
+            return self.calculate_shapes_iou([shape])
         except Exception as e:
             logger.error(f"Error calculating shape IoU: {e}")
             return 0.0
 
+    def calculate_shapes_iou(self, shapes: list[Shape]) -> float:
+        """
+        Calculate IoU for the union of shapes against ground truth.
+
+        Each shape is rasterized only inside its bounding box, and the union
+        is built inside the bounding box of all of them.
+
+        Args:
+            shapes: Shape objects to combine
+
+        Returns:
+            IoU value between 0 and 1
+        """
+        if self._ground_truth is None:
+            return 0.0
+
+        crops = []
+        for shape in shapes:
+            crop = self._shape_to_cropped_mask(shape)
+            if crop is not None:
+                crops.append(crop)
+        if not crops:
+            return 0.0
+        if len(crops) == 1:
+            return self._ground_truth.calculate_iou(*crops[0])
+
+        y1 = min(y for _, (y, _) in crops)
+        x1 = min(x for _, (_, x) in crops)
+        y2 = max(y + mask.shape[0] for mask, (y, _) in crops)
+        x2 = max(x + mask.shape[1] for mask, (_, x) in crops)
+        combined_mask = np.zeros((y2 - y1, x2 - x1), dtype=bool)
+        for mask, (y, x) in crops:
+            combined_mask[
+                y - y1 : y - y1 + mask.shape[0], x - x1 : x - x1 + mask.shape[1]
+            ] |= mask
+        return self._ground_truth.calculate_iou(combined_mask, (y1, x1))
+
+    def _shape_to_cropped_mask(
+        self, shape: Shape
+    ) -> tuple[np.ndarray, tuple[int, int]] | None:
+        assert self._ground_truth is not None
+        points = [[p.x(), p.y()] for p in shape.points]
+        if len(points) < 2:
+            return None
+
+        if shape.shape_type == 'mask' and shape.mask is not None:
+            # The mask is stored cropped, with its top-left corner at points[0]
+            x1, y1 = int(points[0][0]), int(points[0][1])
+            return shape.mask, (y1, x1)
+
+        return labelme.utils.shape_to_cropped_mask(
+            img_shape=self._ground_truth.mask.shape,
+            points=points,
+            shape_type=shape.shape_type if shape.shape_type != 'polygon' else None,
+        )
+
+
+def _calculate_preview_iou(
+    points: list[list[float]],
+    create_mode: str,
+    ground_truth: labelme.utils.GroundTruthMask | None,
+    live_iou: labelme.utils.IncrementalPolygonIoU | None,
+) -> float:
+    """
+    Calculate IoU between a drawing preview and ground truth.
+    Returns 0.0 if no valid shape can be formed.
+    """
+    if ground_truth is None:
+        return 0.0
+
+    try:
+        # Need at least 3 points for polygon
+        if len(points) < 3 and create_mode in ["polygon", "linestrip"]:
+            return 0.0
+
+        # Need at least 2 points for rectangle/circle
+        if len(points) < 2 and create_mode in ["rectangle", "circle"]:
+            return 0.0
+
+        if create_mode in ["polygon", "linestrip"]:
+            # Only the area swept by the cursor is re-rasterized
+            assert live_iou is not None
+            return live_iou.compute(points)
+
+        # Rasterize only inside the rectangle/circle's bounding box
+        mask, offset = labelme.utils.shape_to_cropped_mask(
+            img_shape=ground_truth.mask.shape,
+            points=points[:2],
+            shape_type=create_mode,
+        )
+        return ground_truth.calculate_iou(mask, offset)
+    except Exception as e:
+        logger.debug(f"Error calculating IoU: {e}")
+        return 0.0
+
+
+def _compute_sam_preview(
+    sam: osam.types.Model,
+    image: QtGui.QImage,
+    image_key: str,
+    embedding_cache: EmbeddingCache | None,
+    shape: Shape,
+    createMode: Literal["ai_polygon", "ai_mask"],
+) -> Shape:
+    _update_shape_with_sam(
+        sam=sam,
+        image=image,
+        image_key=image_key,
+        embedding_cache=embedding_cache,
+        shape=shape,
+        createMode=createMode,
+    )
+    return shape
+
 
 def _update_shape_with_sam(
     sam: osam.types.Model,
-    pixmap: QtGui.QPixmap,
+    image: QtGui.QImage,
+    image_key: str,
+    embedding_cache: EmbeddingCache | None,
     shape: Shape,
     createMode: Literal["ai_polygon", "ai_mask"],
 ) -> None:
@@ -1261,7 +1536,7 @@ def _update_shape_with_sam(
         )
 
     image_embedding: osam.types.ImageEmbedding = _compute_image_embedding(
-        sam=sam, pixmap=pixmap
+        sam=sam, image=image, image_key=image_key, embedding_cache=embedding_cache
     )
 
     response: osam.types.GenerateResponse = sam.generate(
@@ -1311,30 +1586,96 @@ def _update_shape_with_sam(
         )
 
 
+def _hash_image(image: QtGui.QImage) -> str:
+    bits = image.constBits()
+    if bits is None:
+        return ""
+    bits.setsize(image.sizeInBytes())
+    return hashlib.blake2b(bits, digest_size=16).hexdigest()
+
+
 def _compute_image_embedding(
-    sam: osam.types.Model, pixmap: QtGui.QPixmap
+    sam: osam.types.Model,
+    image: QtGui.QImage,
+    image_key: str,
+    embedding_cache: EmbeddingCache | None = None,
 ) -> osam.types.ImageEmbedding:
-    return __compute_image_embedding(sam=sam, pixmap=_QPixmapForLruCache(pixmap))
+    return __compute_image_embedding(
+        sam=sam,
+        image=_ImageForLruCache(image=image, key=image_key),
+        embedding_cache=embedding_cache,
+    )
+
+
+class _EmbeddingPrefetchRunnable(QtCore.QRunnable):
+    def __init__(
+        self,
+        sam: osam.types.Model,
+        load_image: Callable[[], tuple[QtGui.QImage, str] | None],
+        embedding_cache: EmbeddingCache | None,
+        cancelled: threading.Event,
+    ):
+        super().__init__()
+        self.sam = sam
+        self.load_image = load_image
+        self.embedding_cache = embedding_cache
+        self.cancelled = cancelled
+
+    def run(self):
+        try:
+            if self.cancelled.is_set():
+                return
+            loaded = self.load_image()
+            if loaded is None or self.cancelled.is_set():
+                return
+            image, image_key = loaded
+            _compute_image_embedding(
+                sam=self.sam,
+                image=image,
+                image_key=image_key,
+                embedding_cache=self.embedding_cache,
+            )
+        except Exception as e:
+            logger.warning("Failed to prefetch image embedding: {}", e)
 
 
-class _QPixmapForLruCache(QtGui.QPixmap):
+class _ImageForLruCache:
+    # Hashed by a key computed once per image rather than by its pixels.
+    # QImage rather than QPixmap, as embeddings are also computed off the GUI
+    # thread.
+    def __init__(self, image: QtGui.QImage, key: str):
+        self.image = image
+        self.key = key
+
     def __hash__(self) -> int:
-        qimage: QtGui.QImage = self.toImage()
-        bits = qimage.constBits()
-        if bits is None:
-            return hash(None)
-        return hash(bits.asstring(qimage.sizeInBytes()))
+        return hash(self.key)
 
     def __eq__(self, other) -> bool:
-        if not isinstance(other, _QPixmapForLruCache):
+        if not isinstance(other, _ImageForLruCache):
             return False
-        return self.__hash__() == other.__hash__()
+        return self.key == other.key
 
 
 @functools.lru_cache(maxsize=3)
 def __compute_image_embedding(
-    sam: osam.types.Model, pixmap: _QPixmapForLruCache
+    sam: osam.types.Model,
+    image: _ImageForLruCache,
+    embedding_cache: EmbeddingCache | None,
 ) -> osam.types.ImageEmbedding:
+    # the on-disk cache outlives the in-memory one and labelme sessions
+    use_embedding_cache: bool = embedding_cache is not None and bool(image.key)
+    if use_embedding_cache:
+        assert embedding_cache is not None
+        image_embedding = embedding_cache.get(model_name=sam.name, image_key=image.key)
+        if image_embedding is not None:
+            return image_embedding
+
     logger.debug("Computing image embeddings for model {!r}", sam.name)
-    image: np.ndarray = labelme.utils.img_qt_to_arr(pixmap.toImage())
-    return sam.encode_image(image=imgviz.asrgb(image))
+    image_arr: np.ndarray = labelme.utils.img_qt_to_arr(image.image)
+    image_embedding = sam.encode_image(image=imgviz.asrgb(image_arr))
+    if use_embedding_cache:
+        assert embedding_cache is not None
+        embedding_cache.put(
+            model_name=sam.name, image_key=image.key, image_embedding=image_embedding
+        )
+    return image_embedding
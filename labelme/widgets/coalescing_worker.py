@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import Callable
+
+from loguru import logger
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QRunnable
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtCore import pyqtSignal
+
+
+class _CoalescingWorkerSignals(QObject):
+    finished = pyqtSignal(int, object)
+    error = pyqtSignal(int, Exception)
+
+
+class _CoalescingWorkerRunnable(QRunnable):
+    def __init__(
+        self,
+        generation: int,
+        function: Callable[[], Any],
+        signals: _CoalescingWorkerSignals,
+    ):
+        super().__init__()
+        self.generation = generation
+        self.function = function
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.function()
+        except Exception as e:
+            self.signals.error.emit(self.generation, e)
+            return
+        self.signals.finished.emit(self.generation, result)
+
+
+class CoalescingWorker(QObject):
+    """
+    Runs functions on a background thread, one at a time.
+
+    At most one request is in flight. Requests submitted meanwhile replace
+    each other, so only the newest one runs once the thread becomes free.
+    Results are delivered on the GUI thread through `finished`, and results
+    of requests submitted before the last `cancel()` are discarded.
+
+    Args:
+        parent: Parent object
+        drop_superseded: Also discard the result of a request when a newer
+            one is already waiting, so that only the latest result of a
+            burst is delivered
+    """
+
+    finished = pyqtSignal(object)
+
+    def __init__(self, parent: QObject | None = None, drop_superseded: bool = False):
+        super().__init__(parent)
+        self._drop_superseded = drop_superseded
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _CoalescingWorkerSignals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.error.connect(self._on_error)
+        self._pending: Callable[[], Any] | None = None
+        self._running = False
+        self._generation = 0
+
+    def submit(self, function: Callable[[], Any]) -> None:
+        self._pending = function
+        if not self._running:
+            self._start_pending()
+
+    def cancel(self) -> None:
+        self._pending = None
+        self._generation += 1
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self._pool.waitForDone(msecs)
+
+    def _start_pending(self) -> None:
+        function, self._pending = self._pending, None
+        if function is None:
+            return
+        self._running = True
+        self._pool.start(
+            _CoalescingWorkerRunnable(
+                generation=self._generation, function=function, signals=self._signals
+            )
+        )
+
+    def _on_finished(self, generation: int, result: Any) -> None:
+        self._running = False
+        superseded = self._drop_superseded and self._pending is not None
+        self._start_pending()
+        if generation == self._generation and not superseded:
+            self.finished.emit(result)
+
+    def _on_error(self, generation: int, e: Exception) -> None:
+        self._running = False
+        self._start_pending()
+        logger.error("Exception occurred in background worker: {}", e)
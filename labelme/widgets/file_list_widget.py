@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import os.path as osp
+from collections.abc import Callable
+from typing import Any
+
+from loguru import logger
+from PyQt5 import QtCore
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt
+
+
+class _LabelFileCheckSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(int, list)
+
+
+class _LabelFileCheckRunnable(QtCore.QRunnable):
+    def __init__(
+        self,
+        generation: int,
+        files: list[tuple[str, str]],
+        signals: _LabelFileCheckSignals,
+    ):
+        super().__init__()
+        self.generation = generation
+        self.files = files
+        self.signals = signals
+
+    def run(self):
+        try:
+            results = [
+                (filename, osp.exists(label_file))
+                for filename, label_file in self.files
+            ]
+        except Exception as e:
+            logger.error("Exception occurred in label file check: {}", e)
+            return
+        self.signals.finished.emit(self.generation, results)
+
+
+class _FileListModel(QtCore.QAbstractListModel):
+    def __init__(self, parent: QtCore.QObject | None = None):
+        super().__init__(parent)
+        # all the files, and the rows of those that match the filter
+        self._all_filenames: list[str] = []
+        self._all_sort_keys: list[Any] = []
+        self._filenames: list[str] = []
+        self._sort_keys: list[Any] = []
+        self._rows: dict[str, int] = {}
+        self._match: Callable[[str], bool] | None = None
+        # sort key of the files, if inserted in sorted order
+        self._sort_key: Callable[[str], Any] | None = None
+        # keyed by file, as rows change when files are inserted or filtered
+        self._label_files: dict[str, str] = {}
+        self._checked: dict[str, bool] = {}
+
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _LabelFileCheckSignals(self)
+        self._signals.finished.connect(self._on_label_files_checked)
+        self._generation = 0
+        self._files_to_check: dict[str, str] = {}
+        self._files_checking: set[str] = set()
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._filenames)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        filename = self._filenames[index.row()]
+        if role == Qt.DisplayRole:
+            return filename
+        if role == Qt.CheckStateRole:
+            checked = self._checked.get(filename)
+            if checked is None:
+                self._request_check(filename)
+                return Qt.Unchecked
+            return Qt.Checked if checked else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def filenames(self) -> list[str]:
+        return self._filenames
+
+    def allFilenames(self) -> list[str]:
+        return self._all_filenames
+
+    def hasFile(self, filename: str) -> bool:
+        return filename in self._label_files
+
+    def findRow(self, filename: str) -> int:
+        return self._rows.get(filename, -1)
+
+    def addFiles(self, filenames: list[str], label_files: list[str]) -> None:
+        self._add_label_files(filenames, label_files)
+        if not filenames:
+            return
+        self._sort_key = None
+        self._all_sort_keys = []
+        self._sort_keys = []
+        self._all_filenames.extend(filenames)
+        if self._match is not None:
+            filenames = [f for f in filenames if self._match(f)]
+        if not filenames:
+            return
+        start = len(self._filenames)
+        self.beginInsertRows(QtCore.QModelIndex(), start, start + len(filenames) - 1)
+        self._filenames.extend(filenames)
+        self._update_rows(start)
+        self.endInsertRows()
+
+    def insertFiles(
+        self,
+        filenames: list[str],
+        label_files: list[str],
+        key: Callable[[str], Any],
+        sort_keys: list[Any] | None = None,
+    ) -> None:
+        self._add_label_files(filenames, label_files)
+        if not filenames:
+            return
+        if key is not self._sort_key:
+            self._all_sort_keys = [key(f) for f in self._all_filenames]
+            self._sort_keys = [key(f) for f in self._filenames]
+            self._sort_key = key
+        if sort_keys is None:
+            sort_keys = [key(filename) for filename in filenames]
+        new_files = sorted(zip(sort_keys, filenames), key=lambda x: x[0])
+
+        self._all_sort_keys, self._all_filenames = _merge_sorted(
+            self._all_sort_keys, self._all_filenames, new_files
+        )
+
+        if self._match is not None:
+            new_files = [x for x in new_files if self._match(x[1])]
+        if not new_files:
+            return
+        start = bisect.bisect_right(self._sort_keys, new_files[0][0])
+        if bisect.bisect_right(self._sort_keys, new_files[-1][0]) == start:
+            # all go between the same two existing files, e.g. at the end
+            self.beginInsertRows(
+                QtCore.QModelIndex(), start, start + len(new_files) - 1
+            )
+            self._sort_keys[start:start] = [sort_key for sort_key, _ in new_files]
+            self._filenames[start:start] = [filename for _, filename in new_files]
+            # rows before them are unchanged
+            self._update_rows(start)
+            self.endInsertRows()
+            return
+
+        # otherwise, append them and then merge them in at once, as inserting
+        # each run of them between existing files updates the view every time
+        first_row = start
+        start = len(self._filenames)
+        self.beginInsertRows(QtCore.QModelIndex(), start, start + len(new_files) - 1)
+        self._filenames.extend(filename for _, filename in new_files)
+        self._sort_keys.extend(sort_key for sort_key, _ in new_files)
+        self.endInsertRows()
+
+        self.layoutAboutToBeChanged.emit()
+        persistent_indexes = self.persistentIndexList()
+        persistent_filenames = [
+            self._filenames[index.row()] for index in persistent_indexes
+        ]
+        self._sort_keys, self._filenames = _merge_sorted(
+            self._sort_keys[:start], self._filenames[:start], new_files
+        )
+        # rows before the first of them are unchanged
+        self._update_rows(first_row)
+        self.changePersistentIndexList(
+            persistent_indexes,
+            [self.index(self._rows[filename]) for filename in persistent_filenames],
+        )
+        self.layoutChanged.emit()
+
+    def _update_rows(self, start: int) -> None:
+        self._rows.update(
+            (filename, row)
+            for row, filename in enumerate(self._filenames[start:], start=start)
+        )
+
+    def _add_label_files(self, filenames: list[str], label_files: list[str]) -> None:
+        assert len(filenames) == len(label_files)
+        for filename in filenames:
+            if filename in self._label_files:
+                raise ValueError(f"File is already in the list: {filename!r}")
+        if len(set(filenames)) != len(filenames):
+            raise ValueError("Files must be unique")
+        self._label_files.update(zip(filenames, label_files))
+
+    def setLabelFiles(self, label_files: dict[str, str]) -> None:
+        assert label_files.keys() == self._label_files.keys()
+        self._label_files = dict(label_files)
+        self._checked = {}
+        # results of checks in flight are for the old label files
+        self._generation += 1
+        self._pool.clear()
+        self._files_to_check = {}
+        self._files_checking = set()
+        if self._filenames:
+            self.dataChanged.emit(
+                self.index(0), self.index(len(self._filenames) - 1), [Qt.CheckStateRole]
+            )
+
+    def setFilter(self, match: Callable[[str], bool] | None) -> None:
+        self.beginResetModel()
+        self._match = match
+        if match is None:
+            self._filenames = list(self._all_filenames)
+            self._sort_keys = list(self._all_sort_keys)
+        elif self._sort_key is None:
+            self._filenames = [f for f in self._all_filenames if match(f)]
+            self._sort_keys = []
+        else:
+            matched = [
+                (sort_key, f)
+                for sort_key, f in zip(self._all_sort_keys, self._all_filenames)
+                if match(f)
+            ]
+            self._sort_keys = [sort_key for sort_key, _ in matched]
+            self._filenames = [f for _, f in matched]
+        self._rows = {filename: row for row, filename in enumerate(self._filenames)}
+        self.endResetModel()
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._all_filenames = []
+        self._all_sort_keys = []
+        self._filenames = []
+        self._sort_keys = []
+        self._rows = {}
+        self._sort_key = None
+        self._label_files = {}
+        self._checked = {}
+        # results of checks in flight are for the old files
+        self._generation += 1
+        self._pool.clear()
+        self._files_to_check = {}
+        self._files_checking = set()
+        self.endResetModel()
+
+    def cancelChecks(self) -> None:
+        # results of the running check, if any, are ignored
+        self._generation += 1
+        self._pool.clear()
+        self._files_to_check = {}
+        self._files_checking = set()
+        self._pool.waitForDone()
+
+    def setChecked(self, filename: str, checked: bool) -> None:
+        self._checked[filename] = checked
+        row = self.findRow(filename)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    def _request_check(self, filename: str) -> None:
+        if filename in self._files_to_check or filename in self._files_checking:
+            return
+        if not self._files_to_check:
+            # batch the rows requested while painting the view
+            QtCore.QTimer.singleShot(0, self._start_check)
+        self._files_to_check[filename] = self._label_files[filename]
+
+    def _start_check(self) -> None:
+        if not self._files_to_check:
+            return
+        files = list(self._files_to_check.items())
+        self._files_to_check = {}
+        self._files_checking.update(filename for filename, _ in files)
+        self._pool.start(
+            _LabelFileCheckRunnable(
+                generation=self._generation, files=files, signals=self._signals
+            )
+        )
+
+    def _on_label_files_checked(
+        self, generation: int, results: list[tuple[str, bool]]
+    ) -> None:
+        if generation != self._generation:
+            return
+        rows = []
+        for filename, checked in results:
+            self._files_checking.discard(filename)
+            # unless it was set meanwhile, e.g. by saving
+            self._checked.setdefault(filename, checked)
+            row = self.findRow(filename)
+            if row >= 0:
+                rows.append(row)
+        if not rows:
+            return
+        self.dataChanged.emit(
+            self.index(min(rows)), self.index(max(rows)), [Qt.CheckStateRole]
+        )
+
+
+def _merge_sorted(
+    sort_keys: list[Any], filenames: list[str], new_files: list[tuple[Any, str]]
+) -> tuple[list[Any], list[str]]:
+    start = bisect.bisect_right(sort_keys, new_files[0][0])
+    if bisect.bisect_right(sort_keys, new_files[-1][0]) == start:
+        sort_keys[start:start] = [sort_key for sort_key, _ in new_files]
+        filenames[start:start] = [filename for _, filename in new_files]
+        return sort_keys, filenames
+    # new_files are sorted, so this sorts two sorted runs in linear time
+    merged = sorted(
+        itertools.chain(zip(sort_keys, filenames), new_files), key=lambda x: x[0]
+    )
+    return [sort_key for sort_key, _ in merged], [filename for _, filename in merged]
+
+
+class FileListWidget(QtWidgets.QListView):
+    """
+    List of image files, checked if they have a label file.
+
+    Backed by a model of plain path lists, so that hundreds of thousands of
+    files are listed at once. Whether a file has a label file is checked in
+    the background for the rows that are shown, and then cached.
+    """
+
+    itemSelectionChanged = QtCore.pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self._model = _FileListModel(self)
+        self.setModel(self._model)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        # lays out only the rows that are shown
+        self.setUniformItemSizes(True)
+        self.selectionModel().selectionChanged.connect(
+            lambda selected, deselected: self.itemSelectionChanged.emit()
+        )
+
+    def count(self) -> int:
+        return self._model.rowCount()
+
+    def addFile(self, filename: str, label_file: str) -> None:
+        self._model.addFiles([filename], label_files=[label_file])
+
+    def addFiles(self, filenames: list[str], label_files: list[str]) -> None:
+        self._model.addFiles(filenames, label_files=label_files)
+
+    def insertFiles(
+        self,
+        filenames: list[str],
+        label_files: list[str],
+        key: Callable[[str], Any],
+        sort_keys: list[Any] | None = None,
+    ) -> None:
+        """
+        Insert files into the list, keeping it sorted.
+
+        Args:
+            filenames: Files to insert, in any order
+            label_files: Label files of the files
+            key: Sort key of the files, the same for every call until cleared
+            sort_keys: Keys of the files if already computed
+        """
+        self._model.insertFiles(
+            filenames, label_files=label_files, key=key, sort_keys=sort_keys
+        )
+
+    def clear(self) -> None:
+        """Remove all the files, keeping the filter."""
+        self._model.clear()
+
+    def cancelLabelFileChecks(self) -> None:
+        """Cancel checking for label files and wait for the running check."""
+        self._model.cancelChecks()
+
+    def setFilter(self, match: Callable[[str], bool] | None) -> None:
+        """
+        Show only the files that match, or all the files if None.
+
+        Files added later are filtered too. Filtering is done in memory, and
+        checked states are kept.
+        """
+        self._model.setFilter(match)
+
+    def setLabelFiles(self, label_files: dict[str, str]) -> None:
+        """Replace the label files of all the files, e.g. on output dir change."""
+        self._model.setLabelFiles(label_files)
+
+    def filenames(self) -> list[str]:
+        """Return the files shown, i.e. those that match the filter."""
+        # shared rather than copied, so it must not be modified
+        return self._model.filenames()
+
+    def allFilenames(self) -> list[str]:
+        # shared rather than copied, so it must not be modified
+        return self._model.allFilenames()
+
+    def hasFile(self, filename: str) -> bool:
+        """Return whether the file is in the list, even if filtered out."""
+        return self._model.hasFile(filename)
+
+    def findRow(self, filename: str) -> int:
+        return self._model.findRow(filename)
+
+    def selectedFilenames(self) -> list[str]:
+        return [
+            self._model.filenames()[index.row()] for index in self.selectedIndexes()
+        ]
+
+    def currentRow(self) -> int:
+        return self.currentIndex().row()
+
+    def setCurrentRow(self, row: int) -> None:
+        self.setCurrentIndex(self._model.index(row))
+
+    def setFileChecked(self, filename: str, checked: bool) -> None:
+        if not self.hasFile(filename):
+            return
+        self._model.setChecked(filename, checked)
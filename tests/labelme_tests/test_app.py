@@ -1,3 +1,4 @@
+import json
 import os.path as osp
 import shutil
 import tempfile
@@ -62,6 +63,45 @@ def test_MainWindow_open_json(qtbot: QtBot):
         win.close()
 
 
+@pytest.mark.gui
+def test_MainWindow_image_key_matches_embedding_prefetch(qtbot: QtBot) -> None:
+    img_file: str = osp.join(data_dir, "raw/2011_000003.jpg")
+    win: labelme.app.MainWindow = labelme.app.MainWindow(filename=img_file)
+    qtbot.addWidget(win)
+    _show_window_and_wait_for_imagedata(qtbot=qtbot, win=win)
+
+    # embeddings prefetched for the file are reused once it is opened
+    loaded = labelme.app._load_image_for_embedding(
+        filename=img_file,
+        label_file=labelme.app.get_label_file(filename=img_file, output_dir=None),
+    )
+    assert loaded is not None
+    assert win.canvas._image_key == loaded[1]
+    win.close()
+
+
+@pytest.mark.gui
+def test_MainWindow_save_reencoded_image_data(qtbot: QtBot, tmp_path) -> None:
+    # re-encoded as PNG, since the extension does not match the content
+    img_file: str = str(tmp_path / "2011_000003.bmp")
+    shutil.copy(osp.join(data_dir, "raw/2011_000003.jpg"), img_file)
+    win: labelme.app.MainWindow = labelme.app.MainWindow(filename=img_file)
+    qtbot.addWidget(win)
+    _show_window_and_wait_for_imagedata(qtbot=qtbot, win=win)
+
+    label_file: str = str(tmp_path / "2011_000003.json")
+    assert win.saveLabels(label_file)
+    assert labelme.LabelFile(label_file).imageData == (
+        labelme.LabelFile.load_image_file(img_file)
+    )
+
+    # the same image key when reopened from the saved data
+    image_key: str = win._image_key
+    assert win.loadFile(img_file)
+    assert win._image_key == image_key
+    win.close()
+
+
 @pytest.mark.gui
 def test_MainWindow_openNextAndPrevImg(qtbot: QtBot) -> None:
     directory: str = osp.join(data_dir, "raw")
@@ -85,6 +125,73 @@ def test_MainWindow_openNextAndPrevImg(qtbot: QtBot) -> None:
     assert osp.basename(win.imagePath) == first_image_name
 
 
+@pytest.mark.gui
+def test_MainWindow_reload_preloaded_after_discard(qtbot: QtBot, tmp_path) -> None:
+    shutil.copytree(osp.join(data_dir, "annotated"), tmp_path / "annotated")
+    label_file: str = str(tmp_path / "annotated/2011_000006.json")
+    with open(label_file) as f:
+        data: dict = json.load(f)
+    data["combinedShapes"] = [{"ids": [0, 1], "error_type": "other", "iou": 0.5}]
+    for i, shape in enumerate(data["shapes"]):
+        shape["id"] = i
+    with open(label_file, "w") as f:
+        json.dump(data, f)
+
+    win: labelme.app.MainWindow = labelme.app.MainWindow(
+        filename=str(tmp_path / "annotated")
+    )
+    qtbot.addWidget(win)
+    _show_window_and_wait_for_imagedata(qtbot=qtbot, win=win)
+
+    second_image: str = str(tmp_path / "annotated/2011_000006.jpg")
+    for _ in range(2):
+        # opened from the preloaded label file
+        qtbot.waitUntil(
+            lambda: any(key[0] == second_image for key in win._image_preloader._cache)
+        )
+        win.openNextImg()
+        qtbot.waitUntil(lambda: win.imagePath == second_image)
+        assert win.combined_shapes == data["combinedShapes"]
+        assert [s.other_data for s in win.canvas.shapes] == [
+            {"id": i} for i in range(len(data["shapes"]))
+        ]
+
+        # edited, but discarded by opening another image
+        win.combined_shapes.append({"ids": [1, 2], "error_type": "other", "iou": 0})
+        for shape in win.canvas.shapes:
+            shape.other_data["id"] += 100
+        assert not win.dirty
+        win.openPrevImg()
+        qtbot.waitUntil(lambda: win.imagePath != second_image)
+    win.close()
+
+
+@pytest.mark.gui
+def test_MainWindow_close_cancelled(qtbot: QtBot, monkeypatch) -> None:
+    directory: str = osp.join(data_dir, "raw")
+    win: labelme.app.MainWindow = labelme.app.MainWindow(filename=directory)
+    qtbot.addWidget(win)
+    _show_window_and_wait_for_imagedata(qtbot=qtbot, win=win)
+
+    cancelled: list[bool] = []
+    cancel_background_tasks = win.canvas.cancel_background_tasks
+    monkeypatch.setattr(
+        win.canvas,
+        "cancel_background_tasks",
+        lambda: cancelled.append(True) or cancel_background_tasks(),
+    )
+
+    # e.g. by the user asked to save the annotations
+    monkeypatch.setattr(win, "mayContinue", lambda: False)
+    assert not win.close()
+    assert win.isVisible()
+    assert not cancelled
+
+    monkeypatch.setattr(win, "mayContinue", lambda: True)
+    assert win.close()
+    assert cancelled
+
+
 @pytest.mark.gui
 def test_MainWindow_annotate_jpg(qtbot: QtBot) -> None:
     tmp_dir: str = tempfile.mkdtemp()
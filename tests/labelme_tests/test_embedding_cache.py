@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import osam
+
+from labelme._automation.embedding_cache import EmbeddingCache
+
+
+def _create_image_embedding(seed):
+    rng = np.random.RandomState(seed)
+    return osam.types.ImageEmbedding(
+        original_height=480,
+        original_width=640,
+        embedding=rng.rand(8, 16, 16).astype(np.float32),
+        extra_features=[rng.rand(4, 32, 32).astype(np.float32)],
+    )
+
+
+def test_EmbeddingCache(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path), max_size_bytes=10 * 1024**2)
+    assert cache.get(model_name="sam", image_key="a") is None
+
+    image_embedding = _create_image_embedding(seed=0)
+    cache.put(model_name="sam", image_key="a", image_embedding=image_embedding)
+    assert cache.get(model_name="sam2", image_key="a") is None
+    loaded = cache.get(model_name="sam", image_key="a")
+    assert loaded is not None
+    assert loaded.original_height == 480
+    assert loaded.original_width == 640
+    np.testing.assert_array_equal(loaded.embedding, image_embedding.embedding)
+    assert len(loaded.extra_features) == 1
+    np.testing.assert_array_equal(
+        loaded.extra_features[0], image_embedding.extra_features[0]
+    )
+
+    # keep room for two files only, and make "a" the least recently used
+    (file_a,) = os.listdir(tmp_path)
+    cache.max_size_bytes = int(os.path.getsize(tmp_path / file_a) * 2.5)
+    cache.put(model_name="sam", image_key="b", image_embedding=image_embedding)
+    os.utime(tmp_path / file_a, (0, 0))
+    cache.put(model_name="sam", image_key="c", image_embedding=image_embedding)
+    assert cache.get(model_name="sam", image_key="a") is None
+    assert cache.get(model_name="sam", image_key="b") is not None
+    assert cache.get(model_name="sam", image_key="c") is not None
+
+
+def test_EmbeddingCache_tmp_files(tmp_path, monkeypatch):
+    cache = EmbeddingCache(cache_dir=str(tmp_path), max_size_bytes=10 * 1024**2)
+    image_embedding = _create_image_embedding(seed=0)
+
+    with monkeypatch.context() as m:
+
+        def savez_compressed(*args, **kwargs):
+            raise OSError("No space left on device")
+
+        m.setattr(np, "savez_compressed", savez_compressed)
+        cache.put(model_name="sam", image_key="a", image_embedding=image_embedding)
+    assert os.listdir(tmp_path) == []
+
+    # left over by a killed process
+    stale_tmp_file = tmp_path / "stale.npz.tmp"
+    stale_tmp_file.touch()
+    os.utime(stale_tmp_file, (0, 0))
+    recent_tmp_file = tmp_path / "recent.npz.tmp"
+    recent_tmp_file.touch()
+    cache.put(model_name="sam", image_key="a", image_embedding=image_embedding)
+    assert not stale_tmp_file.exists()
+    assert recent_tmp_file.exists()
+    assert cache.get(model_name="sam", image_key="a") is not None
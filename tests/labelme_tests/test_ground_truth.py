@@ -0,0 +1,60 @@
+import os.path as osp
+import shutil
+
+import numpy as np
+
+from labelme import _ground_truth
+
+here = osp.dirname(osp.abspath(__file__))
+data_dir = osp.join(here, "data")
+
+
+def test_load_ground_truth(tmp_path):
+    gt_file = str(tmp_path / "2011_000003_gt.json")
+    shutil.copy(osp.join(data_dir, "annotated/2011_000003.json"), gt_file)
+    shutil.copy(osp.join(data_dir, "annotated/2011_000003.jpg"), tmp_path)
+    img_shape = (338, 500)
+
+    shapes, mask = _ground_truth.load_ground_truth(gt_file, img_shape=img_shape)
+    assert shapes
+    assert mask.shape == img_shape
+    assert mask.any()
+    assert not mask.flags.writeable
+    np.testing.assert_array_equal(
+        mask, _ground_truth.shapes_to_combined_mask(img_shape, shapes)
+    )
+    shapes_hit, mask_hit = _ground_truth.load_ground_truth(gt_file, img_shape=img_shape)
+    assert mask_hit is mask
+    # callers get their own shapes
+    assert shapes_hit == shapes
+    shapes_hit[0]["label"] = "modified"
+    assert _ground_truth.load_ground_truth(gt_file, img_shape=img_shape)[0] == shapes
+
+    shapes, mask_from_file = _ground_truth.load_ground_truth(
+        gt_file, img_shape=img_shape, use_cache_file=True
+    )
+    cache_file = tmp_path / "2011_000003_gt.338x500.npy"
+    assert cache_file.exists()
+    np.testing.assert_array_equal(mask_from_file, mask)
+
+    _ground_truth._clear_cache()
+    np.save(cache_file, np.packbits(~mask, axis=-1))
+    _, mask_from_file = _ground_truth.load_ground_truth(
+        gt_file, img_shape=img_shape, use_cache_file=True
+    )
+    np.testing.assert_array_equal(mask_from_file, ~mask)
+
+
+def test_load_ground_truth_cache_size(tmp_path, monkeypatch):
+    gt_file = str(tmp_path / "2011_000003_gt.json")
+    shutil.copy(osp.join(data_dir, "annotated/2011_000003.json"), gt_file)
+    img_shape = (338, 500)
+
+    _ground_truth._clear_cache()
+    # room for the masks of the last 2 image sizes
+    monkeypatch.setattr(_ground_truth, "_CACHE_MAX_SIZE_BYTES", 339 * 500 + 340 * 500)
+    for height in [338, 339, 340]:
+        _ground_truth.load_ground_truth(gt_file, img_shape=(height, 500))
+    assert len(_ground_truth._cache) == 2
+    assert _ground_truth._cache_size_bytes == 339 * 500 + 340 * 500
+    assert all(key[2] != img_shape for key in _ground_truth._cache)
@@ -0,0 +1,77 @@
+import os
+import os.path as osp
+import shutil
+
+import PIL.Image
+from PyQt5 import QtGui
+from pytestqt.qtbot import QtBot
+
+from labelme._image_preloader import ImagePreloader
+from labelme._image_preloader import LoadedImage
+from labelme._image_preloader import get_label_file
+
+here = osp.dirname(osp.abspath(__file__))
+data_dir = osp.join(here, "data")
+
+
+def test_ImagePreloader(qtbot: QtBot, tmp_path):
+    shutil.copytree(osp.join(data_dir, "annotated"), tmp_path / "annotated")
+    shutil.copytree(osp.join(data_dir, "raw"), tmp_path / "raw")
+    files = [
+        (filename, get_label_file(filename=filename, output_dir=None))
+        for filename in [
+            str(tmp_path / "annotated/2011_000003.jpg"),
+            str(tmp_path / "raw/2011_000006.jpg"),
+        ]
+    ]
+
+    preloader = ImagePreloader(max_size_bytes=1024**3)
+    preloader.preload(files=files)
+    preloader.wait()
+    qtbot.waitUntil(lambda: len(preloader._cache) == 2)
+
+    loaded = preloader.get(*files[0])
+    assert loaded is not None
+    assert loaded.label_file_obj is not None
+    assert loaded.label_file_obj.shapes
+    assert loaded.image_path == files[0][0]
+    assert not loaded.image.isNull()
+    assert loaded.image_key
+    # kept in the cache as the most recently used
+    assert list(preloader._cache) == files[::-1]
+    assert preloader.get(*files[0]) is loaded
+
+    loaded = preloader.get(*files[1])
+    assert loaded is not None
+    assert loaded.label_file_obj is None
+    assert loaded.image_path == files[1][0]
+    assert list(preloader._cache) == files
+
+    # stale after the label file is saved
+    stat = os.stat(files[0][1])
+    os.utime(files[0][1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert preloader.get(*files[0]) is None
+    assert list(preloader._cache) == files[1:]
+    assert preloader._size_bytes == loaded.nbytes
+
+    # only the most recently loaded image fits
+    preloader.max_size_bytes = loaded.nbytes * 3 // 2
+    preloader.preload(files=files[::-1])
+    preloader.wait()
+    qtbot.waitUntil(lambda: not preloader._pending)
+    assert len(preloader._cache) == 1
+    assert preloader._size_bytes == next(iter(preloader._cache.values())).nbytes
+
+
+def test_LoadedImage_reencoded(qtbot: QtBot, tmp_path):
+    # re-encoded as PNG, since the extension does not match the content
+    for mode in ["RGB", "RGBA", "L"]:
+        img_file = str(tmp_path / f"2011_000003_{mode}.bmp")
+        PIL.Image.open(osp.join(data_dir, "raw/2011_000003.jpg")).convert(mode).save(
+            img_file, format="PNG"
+        )
+        loaded = LoadedImage(filename=img_file, label_file=str(tmp_path / "none.json"))
+        # as if decoded from the data, which is also what is saved
+        expected = QtGui.QImage.fromData(loaded.image_data)
+        assert loaded.image.format() == expected.format()
+        assert loaded.image == expected
@@ -0,0 +1,44 @@
+import os
+import os.path as osp
+import pathlib
+
+import natsort
+from pytestqt.qtbot import QtBot
+
+from labelme._image_scanner import ImageScanner
+from labelme._image_scanner import iter_image_files
+
+
+def _create_files(root: pathlib.Path) -> list[str]:
+    filenames = []
+    for subdir in ["", "a", "a/b", "c"]:
+        (root / subdir).mkdir(parents=True, exist_ok=True)
+        for i in [1, 2, 10]:
+            filename = root / subdir / f"image{i}.JPG"
+            filename.touch()
+            filenames.append(osp.normpath(filename))
+        (root / subdir / "image.json").touch()
+    os.symlink(root / "a", root / "link")
+    return filenames
+
+
+def test_iter_image_files(tmp_path: pathlib.Path):
+    filenames = _create_files(tmp_path)
+
+    found = []
+    for files in iter_image_files(str(tmp_path), extensions=(".jpg",)):
+        found.extend(files)
+    # not the .json files, nor those in the symlinked directory as in os.walk
+    assert sorted(found) == sorted(filenames)
+
+
+def test_ImageScanner(qtbot: QtBot, tmp_path: pathlib.Path):
+    filenames = _create_files(tmp_path)
+
+    scanner = ImageScanner(sort_key=natsort.os_sort_keygen())
+    found = []
+    scanner.batchFound.connect(lambda files, sort_keys: found.extend(files))
+    with qtbot.waitSignal(scanner.finished):
+        scanner.start(str(tmp_path))
+    scanner.wait()
+    assert natsort.os_sorted(found) == natsort.os_sorted(filenames)
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from labelme import _json
+
+DATA = {
+    "version": "5.8.1",
+    "flags": {"reviewed": False},
+    "shapes": [
+        {
+            "label": '猫 "quoted"\nline',
+            "points": [[1.5, 2], [3e-7, 4.0], [123456.789, -0.1]],
+            "group_id": None,
+            "mask": {"size": [4, 4], "counts": "52203"},
+        }
+    ],
+    "imageData": None,
+    "imageHeight": 2**62,
+}
+
+
+@pytest.fixture(params=["json", "orjson"])
+def backend(request):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    backend = _json.get_backend()
+    _json.set_backend(request.param)
+    yield request.param
+    _json.set_backend(backend)
+
+
+def test_dumps_loads(backend):
+    for indent in [True, False]:
+        text = _json.dumps(DATA, indent=indent)
+        assert _json.loads(text) == DATA
+        assert _json.loads(text.encode()) == DATA
+        assert json.loads(text) == DATA
+        assert ("\n" in text) == indent
+    # beyond what orjson supports
+    assert _json.loads(_json.dumps({"id": 2**64})) == {"id": 2**64}
+
+    if backend == "json":
+        assert _json.dumps(DATA) == json.dumps(DATA, ensure_ascii=False, indent=2)
+        assert _json.dumps(DATA, indent=False) == json.dumps(
+            DATA, ensure_ascii=False, separators=(",", ":")
+        )
+
+
+def test_dumps_loads_unsupported_by_orjson(backend):
+    data = {
+        "points": [[float("nan"), float("inf")], [float("-inf"), 1.0]],
+        "ids": [2**64 + 1, -(2**63) - 1],
+    }
+    text = _json.dumps(data)
+    assert text == json.dumps(data, ensure_ascii=False, indent=2)
+    for s in [text, text.encode()]:
+        loaded = _json.loads(s)
+        assert loaded["ids"] == data["ids"]
+        assert all(isinstance(i, int) for i in loaded["ids"])
+        assert json.dumps(loaded) == json.dumps(data)
+
+    with pytest.raises(json.JSONDecodeError):
+        _json.loads(b'{"points": [NaN, }')
+
+
+def test_loads_long_integer_across_windows(backend):
+    for offset in range(-1, 2 * 19):
+        # the integer of 19 digits ends at the offset from the window end
+        padding = " " * (_json._SCAN_WINDOW_SIZE + offset - 19 - len('{"id": '))
+        for value in [10**18, 10**17]:
+            text = '{"id": ' + padding + str(value) + "}"
+            assert _json._has_long_digits(text) == (value == 10**18)
+            assert _json._has_long_digits(text.encode()) == (value == 10**18)
+            assert _json.loads(text) == {"id": value}
+    text = '{"id": ' + " " * _json._SCAN_WINDOW_SIZE + str(2**64) + "}"
+    assert _json.loads(text) == {"id": 2**64}
+
+
+def test_set_backend():
+    with pytest.raises(ValueError):
+        _json.set_backend("simplejson")
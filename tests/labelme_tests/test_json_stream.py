@@ -0,0 +1,64 @@
+import io
+import json
+
+import pytest
+
+from labelme import _json
+from labelme import _json_stream
+
+DATA = {
+    "version": "5.8.1",
+    "flags": {},
+    "shapes": [
+        {
+            "label": '猫 "quoted"\nline',
+            "points": [[1.5, 2], [3e-7, 4.0]],
+            "group_id": None,
+            "flags": {"occluded": True},
+            "mask": "iVBORw0KGgo\\\\AAAA",
+        },
+        {"label": "dog", "points": [], "other": [{}, [], [1, {"a": []}]]},
+    ],
+    "imagePath": "image.jpg",
+    "imageData": "/9j/" + "A" * 5000,
+    "imageHeight": 480,
+    "imageWidth": 640,
+}
+
+
+@pytest.mark.parametrize("indent", [True, False])
+def test_dump(indent):
+    for data in [DATA, {**DATA, "shapes": []}, {"shapes": []}, {}]:
+        f = io.StringIO()
+        _json_stream.dump(
+            {
+                key: iter(value) if key == "shapes" else value
+                for key, value in data.items()
+            },
+            f,
+            stream_keys=("shapes",),
+            indent=indent,
+        )
+        assert f.getvalue() == _json.dumps(data, indent=indent)
+        if indent and _json.get_backend() == "json":
+            assert f.getvalue() == json.dumps(data, ensure_ascii=False, indent=2)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024**2])
+def test_iter_array_items(chunk_size):
+    for text in [
+        json.dumps(DATA, ensure_ascii=False, indent=2),
+        json.dumps(DATA, separators=(",", ":")),
+        json.dumps({**DATA, "shapes": [0.125, 10, "a"], "imageData": None}),
+    ]:
+        items = list(
+            _json_stream.iter_array_items(
+                io.StringIO(text), key="shapes", chunk_size=chunk_size
+            )
+        )
+        assert items == json.loads(text)["shapes"]
+
+    with pytest.raises(KeyError):
+        list(_json_stream.iter_array_items(io.StringIO('{"a": [1]}'), key="shapes"))
+    with pytest.raises(json.JSONDecodeError):
+        list(_json_stream.iter_array_items(io.StringIO('{"shapes": [1'), key="shapes"))
@@ -0,0 +1,122 @@
+import io
+import json
+import os.path as osp
+import shutil
+
+import numpy as np
+import PIL.Image
+import pytest
+
+import labelme
+from labelme._label_file import LabelFile
+from labelme._label_file import LabelFileError
+
+here = osp.dirname(osp.abspath(__file__))
+data_dir = osp.join(here, "data")
+
+
+def test_LabelFile_lazy_image_data():
+    json_file = osp.join(data_dir, "annotated_with_data/apc2016_obj3.json")
+    label_file = LabelFile(json_file)
+    lazy_label_file = LabelFile(json_file, lazy_image_data=True)
+    assert lazy_label_file._load_image_data is not None
+    assert lazy_label_file.shapes == label_file.shapes
+    assert lazy_label_file.imageData == label_file.imageData
+    assert lazy_label_file._load_image_data is None
+
+
+def test_LabelFile_lazy_image_data_error(tmp_path):
+    json_file = osp.join(data_dir, "annotated/2011_000003.json")
+    shutil.copy(json_file, tmp_path)
+    # the image referred to by imagePath is missing
+    label_file = LabelFile(str(tmp_path / "2011_000003.json"), lazy_image_data=True)
+    assert label_file.shapes
+    with pytest.raises(LabelFileError):
+        label_file.imageData
+
+
+def test_LabelFile_load_shapes_only(tmp_path):
+    json_file = osp.join(data_dir, "annotated/2011_000003.json")
+    shutil.copy(json_file, tmp_path)
+    # the image referred to by imagePath is missing
+    label_file = LabelFile.load_shapes_only(str(tmp_path / "2011_000003.json"))
+    assert label_file.shapes == LabelFile(json_file).shapes
+    with pytest.raises(LabelFileError):
+        label_file.imageData
+
+
+def test_LabelFile_load_image_file(tmp_path):
+    jpg_file = osp.join(data_dir, "raw/2011_000003.jpg")
+    with open(jpg_file, "rb") as f:
+        assert LabelFile.load_image_file(jpg_file) == f.read()
+
+    # re-encoded as PNG, since the extension does not match the content
+    bmp_file = str(tmp_path / "2011_000003.bmp")
+    PIL.Image.open(jpg_file).save(bmp_file)
+    image_data = LabelFile.load_image_file(bmp_file)
+    image_pil = PIL.Image.open(io.BytesIO(image_data))
+    assert image_pil.format == "PNG"
+    np.testing.assert_array_equal(
+        np.asarray(image_pil), np.asarray(PIL.Image.open(bmp_file))
+    )
+    # with the pixels it was encoded from
+    image_data_and_image = LabelFile.load_image_file_and_image(bmp_file)
+    assert image_data_and_image is not None
+    assert image_data_and_image[0] == image_data
+    np.testing.assert_array_equal(
+        np.asarray(image_data_and_image[1]), np.asarray(image_pil)
+    )
+    assert LabelFile.load_image_file_and_image(jpg_file)[1] is None
+
+
+def test_LabelFile_save_iter_shapes(tmp_path):
+    json_file = osp.join(data_dir, "annotated_with_data/apc2016_obj3.json")
+    label_file = LabelFile(json_file)
+    with open(json_file) as f:
+        data = json.load(f)
+
+    out_file = str(tmp_path / "apc2016_obj3.json")
+    LabelFile().save(
+        filename=out_file,
+        shapes=iter(data["shapes"]),
+        imagePath=data["imagePath"],
+        imageHeight=data["imageHeight"],
+        imageWidth=data["imageWidth"],
+        imageData=label_file.imageData,
+        flags=data["flags"],
+    )
+    with open(out_file) as f:
+        assert json.load(f) == {**data, "version": labelme.__version__}
+    assert list(LabelFile.iter_shapes(out_file)) == label_file.shapes
+
+
+def test_LabelFile_save_failure_keeps_file(tmp_path):
+    out_file = tmp_path / "label.json"
+    out_file.write_text("original")
+    out_file.chmod(0o640)
+
+    def iter_shapes():
+        yield dict(label="a", points=[[0, 0]], shape_type="point")
+        raise ValueError("failed to format a shape")
+
+    with pytest.raises(LabelFileError):
+        LabelFile().save(
+            filename=str(out_file),
+            shapes=iter_shapes(),
+            imagePath="image.jpg",
+            imageHeight=10,
+            imageWidth=10,
+        )
+    assert out_file.read_text() == "original"
+    assert [p.name for p in tmp_path.iterdir()] == ["label.json"]
+
+    LabelFile().save(
+        filename=str(out_file),
+        shapes=[],
+        imagePath="image.jpg",
+        imageHeight=10,
+        imageWidth=10,
+    )
+    assert json.loads(out_file.read_text())["shapes"] == []
+    assert out_file.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in tmp_path.iterdir()] == ["label.json"]
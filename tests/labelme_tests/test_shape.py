@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from PyQt5 import QtGui
+from PyQt5.QtCore import QPointF
+
+import labelme.utils
+from labelme.shape import Shape
+
+
+def _nearest_vertex_and_edge(shape, point, epsilon):
+    vertex = edge = None
+    min_vertex_distance = min_edge_distance = float("inf")
+    point = point * shape.scale
+    for i, p in enumerate(shape.points):
+        dist = labelme.utils.distance(p * shape.scale - point)
+        if dist <= epsilon and dist < min_vertex_distance:
+            min_vertex_distance, vertex = dist, i
+        line = [shape.points[i - 1] * shape.scale, p * shape.scale]
+        dist = labelme.utils.distancetoline(point, line)
+        if dist <= epsilon and dist < min_edge_distance:
+            min_edge_distance, edge = dist, i
+    return vertex, edge
+
+
+def test_Shape_nearestVertex_nearestEdge():
+    rng = np.random.RandomState(0)
+    shape = Shape(shape_type="polygon")
+    for x, y in rng.randint(0, 100, size=(30, 2)):
+        shape.addPoint(QPointF(x, y))
+    shape.insertPoint(5, QPointF(shape[4]))  # zero-length edge
+
+    for scale in [0.5, 1.0, 3.0]:
+        Shape.scale = scale
+        for x, y in rng.uniform(-10, 110, size=(200, 2)):
+            point = QPointF(x, y)
+            assert (
+                shape.nearestVertex(point, epsilon=10),
+                shape.nearestEdge(point, epsilon=10),
+            ) == _nearest_vertex_and_edge(shape, point, epsilon=10)
+        shape.moveVertexBy(0, QPointF(1, 1))
+    Shape.scale = 1.0
+
+    assert Shape().nearestVertex(QPointF(0, 0), epsilon=10) is None
+    assert Shape().nearestEdge(QPointF(0, 0), epsilon=10) is None
+
+
+@pytest.mark.gui
+def test_Shape_paint_mask(qtbot):
+    mask = np.zeros((20, 30), dtype=bool)
+    mask[5:15, 10:20] = True
+    shape = Shape(shape_type="mask", mask=mask)
+    shape.points = [QPointF(10, 20), QPointF(40, 40)]
+
+    image = QtGui.QImage(100, 100, QtGui.QImage.Format_RGBA8888)
+    image.fill(0)
+    painter = QtGui.QPainter(image)
+    shape.paint(painter)
+    overlay = shape._mask_overlay
+    contour_path = shape._mask_contour_path
+    shape.paint(painter)
+    assert shape._mask_overlay is overlay
+    assert shape._mask_contour_path is contour_path
+
+    painter.end()
+
+    shape.selected = True
+    image.fill(0)
+    painter = QtGui.QPainter(image)
+    shape.paint(painter)
+    painter.end()
+    assert shape._mask_overlay is not overlay
+
+    # inside the mask, away from the contour
+    assert image.pixelColor(25, 30).getRgb() == Shape.select_fill_color.getRgb()
+    assert image.pixelColor(5, 5).alpha() == 0
+
+    shape_copy = shape.copy()
+    assert shape_copy._mask_overlay is None
+    np.testing.assert_array_equal(shape_copy.mask, mask)
+
+
+def test_Shape_geometry_cache():
+    shape = Shape(shape_type="polygon")
+    for x, y in [(10, 10), (50, 10), (50, 50)]:
+        shape.addPoint(QPointF(x, y))
+
+    path = shape.makePath()
+    assert shape.makePath() is path
+    assert shape.boundingRect() == path.boundingRect()
+    assert shape.containsPoint(QPointF(40, 20))
+
+    shape.moveBy(QPointF(100, 0))
+    assert shape.makePath() is not path
+    assert not shape.containsPoint(QPointF(40, 20))
+    assert shape.containsPoint(QPointF(140, 20))
+
+    shape.moveVertexBy(2, QPointF(0, 50))
+    assert shape.boundingRect().bottom() == 100
+    shape.insertPoint(1, QPointF(100, 0))
+    assert shape.boundingRect().top() == 0
+    shape.removePoint(1)
+    assert shape.boundingRect().top() == 10
+    shape.setShapeRefined(
+        shape_type="rectangle",
+        points=[QPointF(0, 0), QPointF(5, 5)],
+        point_labels=[1, 1],
+    )
+    assert shape.boundingRect() == shape.makePath().boundingRect()
+    assert shape.boundingRect().width() == 5
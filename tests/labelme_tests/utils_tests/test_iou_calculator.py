@@ -0,0 +1,92 @@
+import numpy as np
+
+from labelme.utils import iou_calculator
+from labelme.utils import shape as shape_module
+
+
+def test_calculate_iou():
+    mask1 = np.zeros((10, 10), dtype=bool)
+    mask1[:5] = True
+    mask2 = np.zeros((10, 10), dtype=bool)
+    mask2[:, :5] = True
+    assert iou_calculator.calculate_iou(mask1, mask2) == 25 / 75
+
+
+def test_IncrementalPolygonIoU():
+    img_shape = (120, 160)
+    gt_mask = shape_module.shape_to_mask(
+        img_shape, [[20, 20], [140, 30], [120, 100], [30, 90]]
+    )
+    live_iou = iou_calculator.IncrementalPolygonIoU(gt_mask=gt_mask)
+
+    rng = np.random.RandomState(0)
+    committed: list[list[float]] = []
+    for _ in range(8):
+        for _ in range(3):
+            cursor = [rng.uniform(0, 159), rng.uniform(0, 119)]
+            points = committed + [cursor]
+            iou = live_iou.compute(points)
+            if len(points) < 3:
+                assert iou == 0.0
+                continue
+            expected = iou_calculator.calculate_iou(
+                gt_mask, shape_module.shape_to_mask(img_shape, points)
+            )
+            # polygon outlines may differ by a pixel at the window border
+            assert abs(iou - expected) < 0.01
+        committed.append(cursor)
+
+
+def test_IncrementalPolygonIoU_many_updates():
+    img_shape = (240, 320)
+    gt_mask = shape_module.shape_to_mask(
+        img_shape, [[40, 40], [280, 60], [240, 200], [60, 180]]
+    )
+    live_iou = iou_calculator.IncrementalPolygonIoU(gt_mask=gt_mask)
+
+    rng = np.random.RandomState(0)
+    committed: list[list[float]] = []
+    for i in range(400):
+        if i % 100 == 99:
+            del committed[-5:]  # undo
+        # a simple polygon going around the center
+        angle = 2 * np.pi * len(committed) / 400
+        radius = rng.uniform(60, 110)
+        cursor = [
+            160 + 1.4 * radius * np.cos(angle),
+            120 + radius * np.sin(angle),
+        ]
+        points = committed + [cursor]
+        iou = live_iou.compute(points)
+        if len(points) >= 3:
+            expected = iou_calculator.calculate_iou(
+                gt_mask, shape_module.shape_to_mask(img_shape, points)
+            )
+            assert abs(iou - expected) < 1e-3
+        if len(committed) >= 3:
+            # rasterization errors in the windows do not pile up
+            mask = shape_module.shape_to_mask(img_shape, committed)
+            assert np.count_nonzero(live_iou._mask != mask) < 200
+        committed.append(cursor)
+
+
+def test_GroundTruthMask():
+    img_shape = (120, 160)
+    gt_mask = shape_module.shape_to_mask(
+        img_shape, [[20, 20], [140, 30], [120, 100], [30, 90]]
+    )
+    ground_truth = iou_calculator.GroundTruthMask(gt_mask)
+    assert ground_truth.area == gt_mask.sum()
+    assert ground_truth.bbox == (20, 20, 101, 141)
+
+    for points, shape_type in [
+        ([[10, 10], [60, 50]], "rectangle"),
+        ([[150, 110], [190, 130]], "rectangle"),
+        ([[80, 60], [100, 90]], "circle"),
+        ([[0, 0], [159, 119], [0, 119]], None),
+    ]:
+        mask, offset = shape_module.shape_to_cropped_mask(img_shape, points, shape_type)
+        expected = iou_calculator.calculate_iou(
+            gt_mask, shape_module.shape_to_mask(img_shape, points, shape_type)
+        )
+        assert abs(ground_truth.calculate_iou(mask, offset) - expected) < 1e-3
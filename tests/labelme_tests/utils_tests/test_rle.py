@@ -0,0 +1,19 @@
+import numpy as np
+
+from labelme.utils import rle
+
+
+def test_mask_to_rle():
+    mask = np.zeros((4, 4), dtype=bool)
+    mask[1:3, 1:3] = True
+    # same as pycocotools.mask.encode
+    assert rle.mask_to_rle(mask) == {"size": [4, 4], "counts": "52203"}
+    assert rle.rle_to_mask({"size": [4, 4], "counts": [5, 2, 2, 2, 5]}).tolist() == (
+        mask.tolist()
+    )
+
+    rng = np.random.RandomState(0)
+    for shape in [(1, 1), (7, 5), (120, 160)]:
+        for p in [0.0, 0.01, 0.5, 1.0]:
+            mask = rng.uniform(size=shape) < p
+            np.testing.assert_array_equal(rle.rle_to_mask(rle.mask_to_rle(mask)), mask)
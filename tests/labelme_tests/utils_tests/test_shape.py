@@ -22,3 +22,18 @@ def test_shape_to_mask():
         points = shape["points"]
         mask = shape_module.shape_to_mask(img.shape[:2], points)
         assert mask.shape == img.shape[:2]
+
+
+def test_shape_to_cropped_mask():
+    img, data = get_img_and_data()
+    for shape in data["shapes"]:
+        points = shape["points"]
+        mask = shape_module.shape_to_mask(img.shape[:2], points)
+        cropped_mask, (y1, x1) = shape_module.shape_to_cropped_mask(
+            img.shape[:2], points
+        )
+        assert cropped_mask.sum() == mask.sum()
+        assert (
+            mask[y1 : y1 + cropped_mask.shape[0], x1 : x1 + cropped_mask.shape[1]].sum()
+            == mask.sum()
+        )
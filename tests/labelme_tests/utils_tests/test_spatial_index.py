@@ -0,0 +1,29 @@
+import numpy as np
+
+from labelme.utils.spatial_index import GridIndex
+
+
+def test_GridIndex():
+    rng = np.random.RandomState(0)
+    boxes = []
+    for _ in range(200):
+        x1, y1 = rng.uniform(0, 1000, size=2)
+        w, h = rng.uniform(0, 300, size=2)
+        boxes.append((x1, y1, x1 + w, y1 + h))
+    boxes.append((1000, 1000, -1000, -1000))  # unordered and spanning many cells
+
+    index = GridIndex(cell_size=32)
+    for i, box in enumerate(boxes):
+        index.insert(i, box)
+    assert len(index) == len(boxes)
+
+    for x, y in rng.uniform(-100, 1100, size=(100, 2)):
+        margin = rng.uniform(0, 50)
+        expected = [
+            i
+            for i, (x1, y1, x2, y2) in enumerate(boxes)
+            if min(x1, x2) - margin <= x <= max(x1, x2) + margin
+            and min(y1, y2) - margin <= y <= max(y1, y2) + margin
+        ]
+        assert index.query(x, y, margin=margin) == expected
+    assert index.query(5000, 5000, margin=5000) == list(range(len(boxes)))
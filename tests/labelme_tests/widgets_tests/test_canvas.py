@@ -0,0 +1,302 @@
+import collections
+import functools
+import threading
+
+import numpy as np
+import pytest
+from PyQt5 import QtCore
+from PyQt5 import QtGui
+from PyQt5.QtCore import QPointF
+from PyQt5.QtCore import Qt
+
+from labelme.shape import Shape
+from labelme.utils import iou_calculator
+from labelme.utils import shape as shape_module
+from labelme.widgets import Canvas
+from labelme.widgets import canvas as canvas_module
+
+
+def _create_shape(points, mask=None):
+    shape = Shape(shape_type="mask" if mask is not None else "polygon", mask=mask)
+    for x, y in points:
+        shape.addPoint(QPointF(x, y))
+    shape.close()
+    return shape
+
+
+@pytest.mark.gui
+def test_Canvas_storeShapes_restoreShape(qtbot):
+    canvas = Canvas(epsilon=10.0, double_click="close", num_backups=10, crosshair={})
+    qtbot.addWidget(canvas)
+
+    mask = np.ones((10, 10), dtype=bool)
+    polygon = _create_shape([(0, 0), (10, 0), (10, 10)])
+    mask_shape = _create_shape([(0, 0), (10, 10)], mask=mask)
+    canvas.loadShapes([polygon, mask_shape])
+    assert canvas.shapesBackups[-1][1].mask is mask
+
+    polygon.moveBy(QPointF(5, 5))
+    canvas.storeShapes()
+    previous, latest = canvas.shapesBackups[-2:]
+    assert latest[0] is not previous[0]
+    assert latest[0].points == polygon.points
+    # unchanged shapes share the previous snapshot
+    assert latest[1] is previous[1]
+
+    canvas.restoreShape()
+    assert canvas.shapes[0].points == [QPointF(0, 0), QPointF(10, 0), QPointF(10, 10)]
+    # editing restored shapes must not alter the remaining backups
+    canvas.shapes[1].moveBy(QPointF(1, 1))
+    assert previous[1].points == [QPointF(0, 0), QPointF(10, 10)]
+    canvas.storeShapes()
+    assert canvas.shapesBackups[-1][0] is previous[0]
+    assert canvas.shapesBackups[-1][1] is not previous[1]
+
+
+def _render(canvas, rect=None):
+    image = QtGui.QImage(canvas.size(), QtGui.QImage.Format_RGB32)
+    image.fill(0)
+    if rect is None:
+        canvas.render(image)
+    else:
+        canvas.render(image, rect.topLeft(), QtGui.QRegion(rect))
+    return image
+
+
+@pytest.mark.gui
+def test_Canvas_paintEvent_rect(qtbot):
+    canvas = Canvas(
+        epsilon=10.0,
+        double_click="close",
+        num_backups=10,
+        crosshair=collections.defaultdict(bool),
+    )
+    qtbot.addWidget(canvas)
+    canvas.resize(400, 300)
+    pixmap = QtGui.QPixmap(200, 150)
+    pixmap.fill(QtGui.QColor(40, 80, 120))
+    canvas.loadPixmap(pixmap)
+    canvas.scale = 1.7
+
+    rng = np.random.RandomState(0)
+    shapes = []
+    for x, y in rng.uniform(0, 140, size=(30, 2)):
+        shapes.append(_create_shape([(x, y), (x + 15, y), (x + 10, y + 12)]))
+    canvas.loadShapes(shapes)
+
+    # a partial repaint draws the same pixels as a full one inside the rect
+    rect = QtCore.QRect(50, 40, 120, 90)
+    assert _render(canvas, rect).copy(rect) == _render(canvas).copy(rect)
+
+    # the damaged rect of a shape covers everything it paints
+    shape_rect = canvas._get_shapes_rect([shapes[0]])
+    canvas.loadShapes(shapes[1:])
+    without_shape = _render(canvas)
+    canvas.loadShapes(shapes)
+    with_shape = _render(canvas)
+    for y in range(with_shape.height()):
+        for x in range(with_shape.width()):
+            if with_shape.pixel(x, y) != without_shape.pixel(x, y):
+                assert shape_rect.contains(x, y)
+
+
+@pytest.mark.gui
+def test_Canvas_get_image(qtbot):
+    canvas = Canvas()
+    qtbot.addWidget(canvas)
+    pixmap = QtGui.QPixmap(20, 10)
+    pixmap.fill(QtGui.QColor(40, 80, 120))
+    canvas.loadPixmap(pixmap, image_key="a")
+
+    # converted once for all the SAM prompts on the image
+    image = canvas._get_image()
+    assert image.size() == QtCore.QSize(20, 10)
+    assert canvas._get_image() is image
+
+    canvas.loadPixmap(QtGui.QPixmap(30, 10), image_key="b")
+    assert canvas._get_image().size() == QtCore.QSize(30, 10)
+
+
+@pytest.mark.gui
+def test_Canvas_get_image_key(qtbot):
+    canvas = Canvas()
+    qtbot.addWidget(canvas)
+    pixmap = QtGui.QPixmap(20, 10)
+    pixmap.fill(QtGui.QColor(40, 80, 120))
+
+    canvas.loadPixmap(pixmap, image_key="a")
+    assert canvas._get_image_key() == "a"
+
+    # hashed from the pixels only once needed
+    canvas.loadPixmap(pixmap)
+    assert canvas._image_key is None
+    image_key = canvas._get_image_key()
+    assert image_key == canvas_module._hash_image(pixmap.toImage())
+    canvas.loadPixmap(pixmap.copy())
+    assert canvas._get_image_key() == image_key
+    pixmap.fill(QtGui.QColor(0, 0, 0))
+    canvas.loadPixmap(pixmap)
+    assert canvas._get_image_key() != image_key
+
+
+def test_compute_image_embedding_cache_key():
+    class Sam:
+        name = "sam"
+        num_calls = 0
+
+        def encode_image(self, image):
+            self.num_calls += 1
+            return image.shape
+
+    sam = Sam()
+    image = QtGui.QImage(20, 10, QtGui.QImage.Format_RGB888)
+    image.fill(0)
+    assert canvas_module._compute_image_embedding(sam, image, "a") == (10, 20, 3)
+    assert canvas_module._compute_image_embedding(sam, image.copy(), "a") == (10, 20, 3)
+    assert sam.num_calls == 1
+    canvas_module._compute_image_embedding(sam, image, "b")
+    assert sam.num_calls == 2
+
+
+def test_Canvas_prefetch_image_embeddings(qtbot):
+    class Sam:
+        name = "sam"
+
+        def __init__(self):
+            self.encoded: list[tuple[int, ...]] = []
+
+        def encode_image(self, image):
+            self.encoded.append(image.shape)
+            return image.shape
+
+    canvas = Canvas()
+    qtbot.addWidget(canvas)
+
+    def load_image(width):
+        image = QtGui.QImage(width, 10, QtGui.QImage.Format_RGB888)
+        image.fill(0)
+        return image, f"prefetch-{width}"
+
+    sam = Sam()
+    load_images = [functools.partial(load_image, width) for width in (30, 40)]
+    # the model has not been used yet
+    canvas.prefetch_image_embeddings(load_images)
+    canvas._embedding_prefetch_pool.waitForDone()
+    assert sam.encoded == []
+
+    canvas._ai_model_cache = sam
+    canvas._ai_model_name = sam.name
+    canvas.prefetch_image_embeddings(load_images)
+    canvas._embedding_prefetch_pool.waitForDone()
+    assert sam.encoded == [(10, 30, 3), (10, 40, 3)]
+
+
+def _create_drawing_canvas(qtbot, gt_points):
+    canvas = Canvas(crosshair=collections.defaultdict(bool))
+    qtbot.addWidget(canvas)
+    canvas.resize(160, 120)
+    pixmap = QtGui.QPixmap(160, 120)
+    pixmap.fill(QtGui.QColor(0, 0, 0))
+    canvas.loadPixmap(pixmap, image_key="image")
+    canvas.set_ground_truth_mask(shape_module.shape_to_mask((120, 160), gt_points))
+    canvas.createMode = "polygon"
+    canvas.setEditing(False)
+    return canvas
+
+
+def _send_mouse_event(canvas, x, y, press=False):
+    pos = (QPointF(x, y) + canvas.offsetToCenter()) * canvas.scale
+    if press:
+        canvas.mousePressEvent(
+            QtGui.QMouseEvent(
+                QtCore.QEvent.MouseButtonPress,
+                pos,
+                Qt.LeftButton,
+                Qt.LeftButton,
+                Qt.NoModifier,
+            )
+        )
+    else:
+        canvas.mouseMoveEvent(
+            QtGui.QMouseEvent(
+                QtCore.QEvent.MouseMove, pos, Qt.NoButton, Qt.NoButton, Qt.NoModifier
+            )
+        )
+
+
+def _wait_for_iou(qtbot, canvas):
+    worker = canvas._iou_worker
+    qtbot.waitUntil(lambda: not worker._running and worker._pending is None)
+
+
+@pytest.mark.gui
+def test_Canvas_live_iou_incremental(qtbot, monkeypatch):
+    gt_points = [[20, 20], [140, 30], [120, 100], [30, 90]]
+    canvas = _create_drawing_canvas(qtbot, gt_points=gt_points)
+
+    rasterized_shapes = []
+
+    def shape_to_mask(img_shape, points):
+        rasterized_shapes.append(tuple(img_shape))
+        return shape_module.shape_to_mask(img_shape, points)
+
+    monkeypatch.setattr(iou_calculator, "shape_to_mask", shape_to_mask)
+
+    vertices = [(25, 25), (130, 35), (125, 95), (70, 105), (25, 85)]
+    for i, (x, y) in enumerate(vertices):
+        if i > 0:
+            # approach the next vertex
+            px, py = vertices[i - 1]
+            for t in (0.3, 0.6, 1.0):
+                _send_mouse_event(canvas, px + (x - px) * t, py + (y - py) * t)
+                _wait_for_iou(qtbot, canvas)
+        _send_mouse_event(canvas, x, y, press=True)
+        _wait_for_iou(qtbot, canvas)
+    _send_mouse_event(canvas, 22, 50)
+    _wait_for_iou(qtbot, canvas)
+
+    # only windows around the cursor were rasterized, never the full image
+    assert rasterized_shapes
+    assert (120, 160) not in rasterized_shapes
+    expected = iou_calculator.calculate_iou(
+        canvas.ground_truth_mask,
+        shape_module.shape_to_mask((120, 160), [*vertices, (22, 50)]),
+    )
+    assert abs(canvas._last_iou - expected) < 0.01
+
+
+@pytest.mark.gui
+def test_Canvas_live_iou_coalesced(qtbot, monkeypatch):
+    canvas = _create_drawing_canvas(
+        qtbot, gt_points=[[20, 20], [140, 30], [120, 100], [30, 90]]
+    )
+    _send_mouse_event(canvas, 25, 25, press=True)
+    _send_mouse_event(canvas, 130, 35)
+    _send_mouse_event(canvas, 130, 35, press=True)
+    _wait_for_iou(qtbot, canvas)
+
+    calculated = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def calculate_preview_iou(points, **kwargs):
+        calculated.append(points[-1])
+        started.set()
+        release.wait()
+        # identifies the cursor position of the request
+        return points[-1][0] / 1000
+
+    monkeypatch.setattr(canvas_module, "_calculate_preview_iou", calculate_preview_iou)
+    emitted = []
+    canvas.iouUpdated.connect(emitted.append)
+
+    _send_mouse_event(canvas, 100, 50)
+    assert started.wait(timeout=5)
+    # moved while the first request is being computed
+    for x in range(101, 111):
+        _send_mouse_event(canvas, x, 50)
+    release.set()
+    _wait_for_iou(qtbot, canvas)
+
+    assert calculated == [[100, 50], [110, 50]]
+    assert emitted == [0.11]
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from labelme.widgets.coalescing_worker import CoalescingWorker
+
+
+def _create_blocking(started: threading.Event, release: threading.Event):
+    def blocking():
+        started.set()
+        release.wait()
+        return 0
+
+    return blocking
+
+
+@pytest.mark.gui
+def test_CoalescingWorker(qtbot):
+    worker = CoalescingWorker()
+    results = []
+    worker.finished.connect(results.append)
+
+    started = threading.Event()
+    release = threading.Event()
+    blocking = _create_blocking(started=started, release=release)
+
+    worker.submit(blocking)
+    assert started.wait(timeout=5)
+    # queued while the first one runs: only the latest survives
+    for i in range(1, 5):
+        worker.submit(lambda i=i: i)
+    release.set()
+
+    qtbot.waitUntil(lambda: results == [0, 4])
+
+    worker.submit(blocking)
+    worker.cancel()
+    qtbot.wait(100)
+    worker.wait()
+    qtbot.wait(100)
+    assert results == [0, 4]
+
+
+@pytest.mark.gui
+def test_CoalescingWorker_drop_superseded(qtbot):
+    worker = CoalescingWorker(drop_superseded=True)
+    results = []
+    worker.finished.connect(results.append)
+
+    started = threading.Event()
+    release = threading.Event()
+    worker.submit(_create_blocking(started=started, release=release))
+    assert started.wait(timeout=5)
+    for i in range(1, 5):
+        worker.submit(lambda i=i: i)
+    release.set()
+
+    # the running one is superseded by the latest
+    qtbot.waitUntil(lambda: results == [4])
+    worker.wait()
+    qtbot.wait(100)
+    assert results == [4]
@@ -0,0 +1,113 @@
+import pathlib
+
+import natsort
+import pytest
+from PyQt5.QtCore import Qt
+from pytestqt.qtbot import QtBot
+
+from labelme.widgets import FileListWidget
+
+
+def test_FileListWidget(qtbot: QtBot, tmp_path: pathlib.Path):
+    widget = FileListWidget()
+    qtbot.addWidget(widget)
+
+    filenames = [f"images/{i:05d}.jpg" for i in range(100)]
+    label_files = [str(tmp_path / f"{i:05d}.json") for i in range(100)]
+    for label_file in label_files[::2]:
+        pathlib.Path(label_file).write_text("{}")
+    widget.addFiles(filenames[:-1], label_files=label_files[:-1])
+    widget.addFile(filenames[-1], label_file=label_files[-1])
+    with pytest.raises(ValueError):
+        widget.addFile(filenames[0], label_file=label_files[0])
+
+    assert widget.count() == 100
+    assert widget.filenames() == filenames
+    assert widget.findRow("images/00042.jpg") == 42
+    assert widget.findRow("images/missing.jpg") == -1
+
+    model = widget.model()
+    assert model.data(model.index(42)) == "images/00042.jpg"
+
+    def check_state(row: int) -> Qt.CheckState:
+        return model.data(model.index(row), Qt.CheckStateRole)
+
+    # checked in the background once requested
+    check_state(2)
+    check_state(3)
+    qtbot.waitUntil(lambda: check_state(2) == Qt.Checked)
+    assert check_state(3) == Qt.Unchecked
+
+    widget.setFileChecked("images/00003.jpg", checked=True)
+    assert check_state(3) == Qt.Checked
+
+    # e.g. on close
+    check_state(4)
+    widget.cancelLabelFileChecks()
+    qtbot.wait(10)
+    assert "images/00004.jpg" not in model._checked
+
+    with qtbot.waitSignal(widget.itemSelectionChanged):
+        widget.setCurrentRow(42)
+    assert widget.currentRow() == 42
+    assert widget.selectedFilenames() == ["images/00042.jpg"]
+
+    widget.clear()
+    assert widget.count() == 0
+    assert widget.filenames() == []
+    assert widget.findRow("images/00042.jpg") == -1
+
+
+def test_FileListWidget_insertFiles(qtbot: QtBot):
+    widget = FileListWidget()
+    qtbot.addWidget(widget)
+
+    key = natsort.os_sort_keygen()
+    filenames = [f"images/{i}.jpg" for i in range(100)]
+    # e.g. appended, before the existing files, and between them
+    batches = [
+        filenames[50:90],
+        filenames[90:],
+        filenames[:10],
+        filenames[::-5],
+        filenames,
+    ]
+    for batch in batches:
+        batch = [f for f in batch if widget.findRow(f) < 0]
+        widget.insertFiles(batch, label_files=[f"{f}.json" for f in batch], key=key)
+        for row, filename in enumerate(widget.filenames()):
+            assert widget.findRow(filename) == row
+    assert widget.filenames() == filenames
+    assert widget.findRow("images/42.jpg") == 42
+
+
+def test_FileListWidget_setFilter(qtbot: QtBot):
+    widget = FileListWidget()
+    qtbot.addWidget(widget)
+
+    key = natsort.os_sort_keygen()
+    filenames = [f"images/{i}.jpg" for i in range(100)]
+    widget.insertFiles(
+        filenames[::2], label_files=[f"{f}.json" for f in filenames[::2]], key=key
+    )
+    widget.setFileChecked("images/10.jpg", checked=True)
+
+    widget.setFilter(lambda filename: "1" in filename)
+    assert widget.filenames() == [f for f in filenames[::2] if "1" in f]
+    assert widget.findRow("images/10.jpg") == 0
+    assert widget.findRow("images/2.jpg") == -1
+    assert widget.hasFile("images/2.jpg")
+
+    # inserted files are filtered too
+    widget.insertFiles(
+        filenames[1::2], label_files=[f"{f}.json" for f in filenames[1::2]], key=key
+    )
+    assert widget.filenames() == [f for f in filenames if "1" in f]
+    assert widget.allFilenames() == filenames
+
+    model = widget.model()
+    assert model.data(model.index(0), Qt.CheckStateRole) == Qt.Unchecked
+    assert model.data(model.index(1), Qt.CheckStateRole) == Qt.Checked
+
+    widget.setFilter(None)
+    assert widget.filenames() == filenames
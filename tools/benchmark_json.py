@@ -0,0 +1,90 @@
+import argparse
+import io
+import sys
+import time
+
+import numpy as np
+from loguru import logger
+
+from labelme import _json
+from labelme import _json_stream
+
+
+def _create_label_data(num_shapes: int, num_points: int) -> dict:
+    rng = np.random.RandomState(0)
+    shapes = [
+        dict(
+            label=f"object_{i % 10}",
+            points=rng.uniform(0, 4000, size=(num_points, 2)).tolist(),
+            group_id=None,
+            description="",
+            shape_type="polygon",
+            flags={},
+            mask=None,
+        )
+        for i in range(num_shapes)
+    ]
+    return dict(
+        version="5.8.1",
+        flags={},
+        shapes=shapes,
+        imagePath="image.jpg",
+        imageData=None,
+        imageHeight=3000,
+        imageWidth=4000,
+    )
+
+
+def _measure(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t_start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark JSON serialization of label files per backend."
+    )
+    parser.add_argument("--num-shapes", type=int, default=1000)
+    parser.add_argument("--num-points", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.remove(0)
+    logger.add(sys.stderr, level="INFO", format="{message}")
+
+    data = _create_label_data(num_shapes=args.num_shapes, num_points=args.num_points)
+
+    backends: list[_json.Backend] = ["json"]
+    if _json.orjson is not None:
+        backends.append("orjson")
+    else:
+        logger.warning("orjson is not installed, so only json is measured")
+
+    for backend in backends:
+        _json.set_backend(backend)
+        for indent in [True, False]:
+            text = _json.dumps(data, indent=indent)
+
+            def dump():
+                _json_stream.dump(
+                    data, io.StringIO(), stream_keys=("shapes",), indent=indent
+                )
+
+            logger.info(
+                "backend={:6s} indent={:d} size={:5.1f}MB "
+                "dumps={:6.3f}s dump(streaming)={:6.3f}s loads={:6.3f}s",
+                backend,
+                indent,
+                len(text) / 1024**2,
+                _measure(lambda: _json.dumps(data, indent=indent), args.repeat),
+                _measure(dump, args.repeat),
+                _measure(lambda: _json.loads(text), args.repeat),
+            )
+
+
+if __name__ == "__main__":
+    main()